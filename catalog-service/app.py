@@ -1,9 +1,14 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-import psycopg2
+from flask_compress import Compress
 from psycopg2.extras import RealDictCursor
 import logging
 from config import Config
+from db import ReadinessCheck, get_db_connection, pool
+from json_provider import init_json
+from metrics import init_metrics
+import tracing
+import profiler
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,14 +18,28 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+init_json(app, Config.JSON_PROVIDER)
+app.config.update(
+    # Samo JSON odgovori; stream-ovi se ne kompresuju
+    COMPRESS_MIMETYPES=['application/json'],
+    COMPRESS_STREAMS=False,
+    COMPRESS_ALGORITHM=Config.COMPRESS_ALGORITHMS,
+    COMPRESS_MIN_SIZE=Config.COMPRESS_MIN_SIZE,
+    COMPRESS_LEVEL=Config.COMPRESS_GZIP_LEVEL,
+    COMPRESS_BR_LEVEL=Config.COMPRESS_BR_LEVEL,
+)
+Compress(app)
+init_metrics(app)
+tracing.configure(
+    'catalog-service',
+    file_path=Config.TRACE_EXPORT_FILE,
+    collector_url=Config.TRACE_COLLECTOR_URL,
+    sample_ratio=Config.TRACE_SAMPLE_RATIO
+)
+tracing.init_flask(app)
+profiler.init_flask(app, Config.ADMIN_TOKEN, Config.PROFILE_MAX_SECONDS)
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**Config.get_db_params())
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        raise
+readiness = ReadinessCheck(pool, cache_seconds=Config.READINESS_CACHE_SECONDS)
 
 
 @app.route('/health', methods=['GET'])
@@ -40,6 +59,23 @@ def health():
         }), 503
 
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness: proces odgovara na zahteve; ne dodiruje bazu ni druge servise."""
+    return jsonify({'status': 'alive', 'service': 'catalog-service'}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: baza preko konekcije iz pool-a, rezultat keširan nekoliko sekundi."""
+    ready, database = readiness.check()
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'service': 'catalog-service',
+        'database': database
+    }), 200 if ready else 503
+
+
 @app.route('/products', methods=['GET'])
 def get_products():
     try:
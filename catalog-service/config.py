@@ -15,12 +15,41 @@ class Config:
     DB_USER = os.getenv('CATALOG_DB_USER', 'cataloguser')
     DB_PASSWORD = os.getenv('CATALOG_DB_PASSWORD', 'catalogpass123')
     
+    # Pool konekcija po gunicorn worker-u; u gevent modu ograničava broj
+    # istovremenih upita, ostali zahtevi čekaju slobodnu konekciju
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '5'))
+    # /readyz kešira rezultat provere baze
+    READINESS_CACHE_SECONDS = float(os.getenv('READINESS_CACHE_SECONDS', '5'))
+    # Upiti sporiji od ovoga se loguju (bez vrednosti parametara)
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+    
+    # Tracing (tracing.py): OTLP/JSON span-ovi u fajl i/ili na collector;
+    # bez oba se traceparent i dalje prenosi, ali se span-ovi ne izvoze
+    TRACE_EXPORT_FILE = os.getenv('TRACE_EXPORT_FILE', '')
+    TRACE_COLLECTOR_URL = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', '')
+    TRACE_SAMPLE_RATIO = float(os.getenv('TRACE_SAMPLE_RATIO', '1.0'))
+
+    # GET /admin/profile (profiler.py): bez tokena endpoint nije registrovan.
+    # Trajanje ispod GUNICORN_TIMEOUT-a, da gunicorn ne ubije worker
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '30'))
+    
     # Service Configuration
     SERVICE_HOST = os.getenv('CATALOG_SERVICE_HOST', '0.0.0.0')
     SERVICE_PORT = int(os.getenv('CATALOG_SERVICE_PORT', '5001'))
     
     # Flask Configuration
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+    # JSON serializacija odgovora: 'orjson' ili 'default' (stdlib json)
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    # Kompresija odgovora (Accept-Encoding), redosled je prioritet servera
+    COMPRESS_ALGORITHMS = [
+        name.strip() for name in os.getenv('COMPRESS_ALGORITHMS', 'br,gzip').split(',') if name.strip()
+    ]
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', '4'))
     
     @staticmethod
     def get_db_connection_string():
@@ -0,0 +1,134 @@
+"""
+Service Metrics
+Prometheus /metrics endpoint: broj zahteva i trajanje po ruti, zahtevi u
+obradi i trajanje upita ka bazi (db.py). Vreme u bazi i broj upita se
+sabiraju i po zahtevu i vraćaju u Server-Timing zaglavlju
+(db;dur=12.3;desc="4 queries", app;dur=20.1).
+
+Gunicorn pokreće više worker procesa, pa su brojači u multiprocess modu:
+svaki proces piše svoje vrednosti u PROMETHEUS_MULTIPROC_DIR (postavlja ga
+gunicorn.conf.py), a /metrics ih sabira. Bez te promenljive (testovi,
+flask run) koristi se običan registry procesa.
+
+Isti modul postoji u order-service i catalog-service.
+"""
+import os
+import time
+from contextvars import ContextVar
+from flask import Response, g, request
+from prometheus_client import (
+    REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+    multiprocess, CONTENT_TYPE_LATEST
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+http_requests = Counter(
+    'http_requests',
+    'HTTP requests handled, by route and status',
+    ['method', 'route', 'status']
+)
+http_request_seconds = Histogram(
+    'http_request_duration_seconds',
+    'Time to produce the HTTP response, by route',
+    ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+http_requests_in_flight = Gauge(
+    'http_requests_in_flight',
+    'HTTP requests currently being handled',
+    multiprocess_mode='livesum'
+)
+db_query_seconds = Histogram(
+    'db_query_duration_seconds',
+    'Duration of database queries, by statement type',
+    ['operation'], buckets=LATENCY_BUCKETS
+)
+
+_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'}
+
+
+class QueryStats:
+    """Upiti tekućeg zahteva (thread-a ili greenlet-a)."""
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_query_stats = ContextVar('query_stats', default=None)
+
+
+def query_operation(query):
+    """Prva reč SQL naredbe kao labela (ograničen skup vrednosti)."""
+    if isinstance(query, bytes):
+        query = query[:16].decode('ascii', 'replace')
+    words = query.split(None, 1) if isinstance(query, str) else None
+    operation = words[0].upper() if words else ''
+    return operation if operation in _OPERATIONS else 'OTHER'
+
+
+def observe_query(query, seconds):
+    db_query_seconds.labels(operation=query_operation(query)).observe(seconds)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += seconds
+
+
+def _route():
+    # Šablon rute (/orders/<int:order_id>), ne putanja, da broj serija ostane ograničen
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.query_stats = QueryStats()
+    g.query_stats_token = _query_stats.set(g.query_stats)
+    http_requests_in_flight.inc()
+
+
+def _after_request(response):
+    started = g.get('metrics_started')
+    if started is not None:
+        route = _route()
+        elapsed = time.perf_counter() - started
+        http_request_seconds.labels(method=request.method, route=route).observe(elapsed)
+        http_requests.labels(
+            method=request.method, route=route, status=str(response.status_code)
+        ).inc()
+
+        stats = g.query_stats
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries", '
+            f'app;dur={elapsed * 1000:.1f}'
+        )
+    return response
+
+
+def _teardown_request(exc):
+    if g.pop('metrics_started', None) is not None:
+        http_requests_in_flight.dec()
+        try:
+            _query_stats.reset(g.pop('query_stats_token'))
+        except ValueError:
+            _query_stats.set(None)
+
+
+def render():
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+def init_metrics(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule(
+        '/metrics', 'metrics',
+        lambda: Response(render(), content_type=CONTENT_TYPE_LATEST)
+    )
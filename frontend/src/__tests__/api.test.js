@@ -62,4 +62,33 @@ describe('API Service Tests', () => {
     expect(result.success).toBe(true);
     expect(result.order.order_number).toBe('ORD-TEST-001');
   });
+
+  test('orderApi.subscribeToOrderEvents should forward SSE events', () => {
+    const sources = [];
+    global.EventSource = jest.fn(function (url) {
+      this.url = url;
+      this.listeners = {};
+      this.addEventListener = (type, fn) => { this.listeners[type] = fn; };
+      this.close = jest.fn();
+      sources.push(this);
+    });
+
+    const onOrder = jest.fn();
+    const onResync = jest.fn();
+    const unsubscribe = orderApi.subscribeToOrderEvents({ onOrder, onResync });
+    const source = sources[0];
+
+    expect(source.url).toBe('/api/orders/orders/events');
+    source.listeners.order({ data: '{"id": 1, "status": "completed"}' });
+    expect(onOrder).toHaveBeenCalledWith({ id: 1, status: 'completed' });
+
+    // Posle prekida i ponovnog povezivanja lista se ponovo učitava
+    source.onerror();
+    source.onopen();
+    expect(onResync).toHaveBeenCalledTimes(1);
+
+    unsubscribe();
+    expect(source.close).toHaveBeenCalled();
+    delete global.EventSource;
+  });
 });
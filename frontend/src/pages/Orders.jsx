@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from 'react';
+import React, { useEffect, useState, useCallback, useRef } from 'react';
 import { orderApi } from '../services/api';
 
 // ── Status Badge ──────────────────────────────────────────
@@ -191,14 +191,36 @@ export default function Orders() {
   // Initial load
   useEffect(() => { fetchOrders(); }, [fetchOrders]);
 
-  // Auto-refresh ogni 5s se ci sono ordini pending/processing
+  // Live izmene statusa preko SSE (GET /orders/events)
+  const [live, setLive] = useState(false);
+  const ordersRef = useRef(orders);
+  ordersRef.current = orders;
+
+  useEffect(() => {
+    const unsubscribe = orderApi.subscribeToOrderEvents({
+      onOrder: (event) => {
+        // Nepoznata narudžbina (npr. kreirana u drugom tabu): učitaj listu
+        if (!ordersRef.current.some(o => o.id === event.id)) {
+          fetchOrders(true);
+          return;
+        }
+        setOrders(current => current.map(o => (o.id === event.id ? { ...o, ...event } : o)));
+        setLastRefresh(new Date());
+      },
+      onResync: () => fetchOrders(true),
+    });
+    setLive(Boolean(unsubscribe));
+    return () => unsubscribe && unsubscribe();
+  }, [fetchOrders]);
+
+  // Bez EventSource-a: osvežavanje na 5s dok ima pending/processing narudžbina
   useEffect(() => {
     const hasPending = orders.some(o => ['pending', 'processing'].includes(o.status));
-    if (!hasPending) return;
+    if (live || !hasPending) return;
 
     const interval = setInterval(() => fetchOrders(true), 5000);
     return () => clearInterval(interval);
-  }, [orders, fetchOrders]);
+  }, [orders, fetchOrders, live]);
 
   // Stats
   const stats = orders.reduce((acc, o) => {
@@ -318,7 +340,9 @@ export default function Orders() {
             background: 'var(--accent2)',
             animation: 'pulse 1.5s infinite',
           }} />
-          Auto-refreshing every 5s while orders are processing...
+          {live
+            ? 'Live updates while orders are processing...'
+            : 'Auto-refreshing every 5s while orders are processing...'}
         </div>
       )}
     </div>
@@ -30,4 +30,24 @@ export const orderApi = {
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify(orderData),
     }).then(handleResponse),
+
+  // SSE: onOrder({ id, status, pdf_url, ... }) za svaku promenu narudžbine;
+  // onResync() kada su događaji mogli biti propušteni (ponovno povezivanje).
+  // Vraća funkciju za zatvaranje veze, ili null ako EventSource nije podržan.
+  subscribeToOrderEvents: ({ onOrder, onResync }) => {
+    if (typeof EventSource === 'undefined') return null;
+
+    const source = new EventSource(`${ORDER_API}/orders/events`);
+    let reconnecting = false;
+
+    source.addEventListener('order', (e) => onOrder(JSON.parse(e.data)));
+    source.addEventListener('resync', () => onResync());
+    source.onerror = () => { reconnecting = true; };
+    source.onopen = () => {
+      if (reconnecting) onResync();
+      reconnecting = false;
+    };
+
+    return () => source.close();
+  },
 };
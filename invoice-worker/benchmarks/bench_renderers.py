@@ -0,0 +1,68 @@
+"""
+Benchmark PDF renderera (platypus vs canvas)
+python invoice-worker/benchmarks/bench_renderers.py --items 5 --seconds 5
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pdf_generator import generate_invoice_pdf, RENDERERS
+
+
+def build_order(item_count):
+    items = [
+        {
+            'product_code': f'PROD-{i:03d}',
+            'product_name': f'Proizvod {i}',
+            'quantity': i,
+            'unit_price': 10.00 * i,
+            'total_price': 10.00 * i * i
+        }
+        for i in range(1, item_count + 1)
+    ]
+    return {
+        'order_id': 1,
+        'order_number': 'ORD-20260101-BENCH1',
+        'customer_id': 'CUST-001',
+        'customer_name': 'Marko Markovic',
+        'items': items,
+        'total_price': sum(item['total_price'] for item in items),
+        'created_at': '2026-01-01T10:00:00'
+    }
+
+
+def bench(renderer, order, seconds):
+    generate_invoice_pdf(order, renderer=renderer)  # warm-up
+
+    count = 0
+    size = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        size = len(generate_invoice_pdf(order, renderer=renderer))
+        count += 1
+    elapsed = time.perf_counter() - start
+    return count / elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Invoice renderer benchmark')
+    parser.add_argument('--items', type=int, nargs='+', default=[2, 20, 200])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    print(f"{'renderer':<10} {'items':>6} {'invoices/s':>12} {'bytes':>8}")
+    for item_count in args.items:
+        order = build_order(item_count)
+        for renderer in RENDERERS:
+            rate, size = bench(renderer, order, args.seconds)
+            print(f"{renderer:<10} {item_count:>6} {rate:>12.1f} {size:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark uploada PDF-a: novi BlobServiceClient + create_container po uploadu
+vs deljeni InvoiceBlobStorage.
+
+Bez --connection-string pokreće se lokalni stand-in koji emulira minimalni
+deo Azurite Blob API-ja (kreiranje kontejnera i upload bloba), sa opcionim
+kašnjenjem po zahtevu koje simulira mrežu.
+
+python invoice-worker/benchmarks/bench_upload.py --uploads 200 --latency-ms 2
+python invoice-worker/benchmarks/bench_upload.py --connection-string "$AZURE_STORAGE_CONNECTION_STRING"
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from azure.storage.blob import BlobServiceClient
+from blob_storage import InvoiceBlobStorage
+
+ACCOUNT_KEY = ('Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/'
+               'K1SZFPTOtr/KBHBeksoGMGw==')
+CONTAINER = 'bench-invoices'
+
+
+class AzuriteStandIn(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    containers = set()
+    latency = 0.0
+    requests_served = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, error_code=None):
+        body = b''
+        if error_code:
+            body = (f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{error_code}'
+                    f'</Code><Message>{error_code}</Message></Error>').encode()
+        self.send_response(status)
+        self.send_header('ETag', '"0x8D000000000000"')
+        self.send_header('Last-Modified', formatdate(usegmt=True))
+        self.send_header('x-ms-request-id', '00000000-0000-0000-0000-000000000000')
+        self.send_header('x-ms-version', self.headers.get('x-ms-version', '2021-08-06'))
+        if error_code:
+            self.send_header('x-ms-error-code', error_code)
+            self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_PUT(self):
+        type(self).requests_served += 1
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.latency)
+
+        path = self.path.split('?')[0].strip('/').split('/')
+        container = path[1] if len(path) > 1 else ''
+        if 'restype=container' in self.path:
+            if container in self.containers:
+                return self._reply(409, 'ContainerAlreadyExists')
+            self.containers.add(container)
+            return self._reply(201)
+        return self._reply(201)
+
+
+def start_stand_in(latency_ms):
+    AzuriteStandIn.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), AzuriteStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    return server, (
+        'DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;'
+        f'AccountKey={ACCOUNT_KEY};'
+        f'BlobEndpoint=http://127.0.0.1:{port}/devstoreaccount1;'
+    )
+
+
+def upload_per_call(connection_string, pdf_bytes, uploads):
+    """Ponašanje pre izmene: novi klijent i create_container za svaki PDF."""
+    for i in range(uploads):
+        blob_service = BlobServiceClient.from_connection_string(connection_string)
+        container_client = blob_service.get_container_client(CONTAINER)
+        try:
+            container_client.create_container()
+        except Exception:
+            pass
+        blob_client = blob_service.get_blob_client(container=CONTAINER, blob=f"ORD-{i}.pdf")
+        blob_client.upload_blob(pdf_bytes, overwrite=True)
+
+
+def upload_shared(connection_string, pdf_bytes, uploads):
+    storage = InvoiceBlobStorage(connection_string, CONTAINER)
+    storage.ensure_container()
+    for i in range(uploads):
+        blob_client = storage.upload(f"ORD-{i}.pdf", pdf_bytes)
+        storage.generate_read_url(blob_client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Invoice upload benchmark')
+    parser.add_argument('--uploads', type=int, default=200)
+    parser.add_argument('--pdf-kb', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--connection-string')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    server = None
+    connection_string = args.connection_string
+    if not connection_string:
+        server, connection_string = start_stand_in(args.latency_ms)
+
+    pdf_bytes = b'%PDF' + os.urandom(args.pdf_kb * 1024)
+
+    print(f"{'mode':<10} {'uploads/s':>10} {'requests':>9}")
+    for name, run in (('per-call', upload_per_call), ('shared', upload_shared)):
+        AzuriteStandIn.requests_served = 0
+        start = time.perf_counter()
+        run(connection_string, pdf_bytes, args.uploads)
+        elapsed = time.perf_counter() - start
+        served = AzuriteStandIn.requests_served if server else '-'
+        print(f"{name:<10} {args.uploads / elapsed:>10.1f} {served:>9}")
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
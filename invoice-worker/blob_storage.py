@@ -0,0 +1,98 @@
+"""
+Invoice Blob Storage
+Deljeni BlobServiceClient sa pool-om konekcija; klijent, kredencijali za SAS
+i postojanje kontejnera se inicijalizuju jednom po procesu
+"""
+import logging
+import requests
+from datetime import datetime, timezone, timedelta
+from requests.adapters import HTTPAdapter
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+
+logger = logging.getLogger(__name__)
+
+
+def parse_connection_string(conn_str):
+    parts = {}
+    for segment in conn_str.split(';'):
+        if '=' in segment:
+            key, value = segment.split('=', 1)
+            parts[key.strip()] = value.strip()
+    return parts
+
+
+class InvoiceBlobStorage:
+
+    def __init__(self, connection_string, container_name, pool_size=10,
+                 max_single_put_size=4 * 1024 * 1024, max_block_size=4 * 1024 * 1024,
+                 max_concurrency=4):
+        self.container_name = container_name
+        self.max_concurrency = max_concurrency
+
+        conn_parts = parse_connection_string(connection_string)
+        self.account_name = conn_parts.get('AccountName', 'devstoreaccount1')
+        self.account_key = conn_parts.get('AccountKey', '')
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        self.service_client = BlobServiceClient.from_connection_string(
+            connection_string,
+            transport=RequestsTransport(session=session, session_owner=False),
+            # Veći fajlovi se šalju kao block blob: stage_block u paraleli + commit
+            max_single_put_size=max_single_put_size,
+            max_block_size=max_block_size
+        )
+        self.container_client = self.service_client.get_container_client(container_name)
+
+    def ensure_container(self):
+        try:
+            self.container_client.create_container()
+            logger.info(f"Container '{self.container_name}' created")
+        except ResourceExistsError:
+            pass
+
+    def get_blob_client(self, blob_name):
+        return self.container_client.get_blob_client(blob_name)
+
+    def upload(self, blob_name, data, metadata=None, length=None):
+        """
+        data može biti bytes ili fajl-like stream. Do max_single_put_size SDK
+        šalje sadržaj jednim PUT-om (pročita ga celog), a veći stream čita i
+        šalje u blokovima od max_block_size, najviše max_concurrency odjednom.
+        """
+        blob_client = self.get_blob_client(blob_name)
+        blob_client.upload_blob(
+            data,
+            length=length,
+            overwrite=True,
+            metadata=metadata,
+            max_concurrency=self.max_concurrency
+        )
+        return blob_client
+
+    def download(self, blob_name):
+        return self.get_blob_client(blob_name).download_blob().readall()
+
+    def delete(self, blob_name):
+        """Briše blob; False ako ne postoji (npr. ponovljena isporuka)."""
+        try:
+            self.get_blob_client(blob_name).delete_blob()
+        except ResourceNotFoundError:
+            return False
+        return True
+
+    def generate_read_url(self, blob_client, expiry_days=365):
+        sas_token = generate_blob_sas(
+            account_name=self.account_name,
+            container_name=self.container_name,
+            blob_name=blob_client.blob_name,
+            account_key=self.account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.now(timezone.utc) + timedelta(days=expiry_days),
+        )
+        return f"{blob_client.url}?{sas_token}"
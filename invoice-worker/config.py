@@ -10,6 +10,17 @@ load_dotenv()
 class Config:
     ORDER_SERVICE_URL = os.getenv('ORDER_SERVICE_URL', 'http://order-service:5002')
 
+    # Order baza; koristi je samo regenerate.py (worker radi preko Order Service API-ja)
+    ORDER_DB_HOST = os.getenv('ORDER_DB_HOST', 'localhost')
+    ORDER_DB_PORT = os.getenv('ORDER_DB_PORT', '5433')
+    ORDER_DB_NAME = os.getenv('ORDER_DB_NAME', 'orderdb')
+    ORDER_DB_USER = os.getenv('ORDER_DB_USER', 'orderuser')
+    ORDER_DB_PASSWORD = os.getenv('ORDER_DB_PASSWORD', 'orderpass123')
+
+    # Ažuriranja faktura se šalju u batch-evima (POST /orders/invoices)
+    CALLBACK_BATCH_SIZE = int(os.getenv('CALLBACK_BATCH_SIZE', '20'))
+    CALLBACK_FLUSH_INTERVAL_SECONDS = float(os.getenv('CALLBACK_FLUSH_INTERVAL_SECONDS', '2'))
+
     AZURE_STORAGE_CONNECTION_STRING = os.getenv(
         'AZURE_STORAGE_CONNECTION_STRING',
         'DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;'
@@ -18,6 +29,65 @@ class Config:
         'QueueEndpoint=http://localhost:10001/devstoreaccount1;'
     )
     AZURE_QUEUE_NAME = os.getenv('AZURE_QUEUE_NAME', 'invoice-queue')
+    AZURE_BULK_QUEUE_NAME = os.getenv('AZURE_BULK_QUEUE_NAME', f'{AZURE_QUEUE_NAME}-bulk')
+    # Lane -> red; 'realtime' su narudžbine kupaca, 'bulk' backfill i regeneracija
+    LANE_QUEUES = {'realtime': AZURE_QUEUE_NAME, 'bulk': AZURE_BULK_QUEUE_NAME}
+    # Težine weighted round robin-a: od 5 stranica poruka 4 idu realtime lane-u
+    LANE_WEIGHTS = os.getenv('LANE_WEIGHTS', 'realtime:4,bulk:1')
+    AZURE_POISON_QUEUE_NAME = os.getenv('AZURE_POISON_QUEUE_NAME', f'{AZURE_QUEUE_NAME}-poison')
+    # Posle ovoliko neuspešnih pokušaja poruka se prebacuje u poison red
+    MAX_DEQUEUE_COUNT = int(os.getenv('MAX_DEQUEUE_COUNT', '5'))
     AZURE_BLOB_CONTAINER = os.getenv('AZURE_BLOB_CONTAINER_INVOICES', 'invoices')
+    # Claim-check payload-i koje Order Service nije mogao da stavi u poruku
+    AZURE_PAYLOAD_CONTAINER = os.getenv('AZURE_BLOB_CONTAINER_PAYLOADS', 'invoice-payloads')
+    BLOB_CONNECTION_POOL_SIZE = int(os.getenv('BLOB_CONNECTION_POOL_SIZE', '10'))
+    # PDF do BLOB_MAX_SINGLE_PUT_SIZE ide jednim PUT-om (SDK ga čita celog u memoriju);
+    # veći se šalje u blokovima, pa je u memoriji najviše BLOCK_SIZE * CONCURRENCY
+    BLOB_MAX_SINGLE_PUT_SIZE = int(os.getenv('BLOB_MAX_SINGLE_PUT_SIZE', str(256 * 1024)))
+    BLOB_MAX_BLOCK_SIZE = int(os.getenv('BLOB_MAX_BLOCK_SIZE', str(256 * 1024)))
+    BLOB_UPLOAD_MAX_CONCURRENCY = int(os.getenv('BLOB_UPLOAD_MAX_CONCURRENCY', '4'))
 
     POLL_INTERVAL_SECONDS = int(os.getenv('POLL_INTERVAL_SECONDS', '5'))
+    # Poruke se preuzimaju u stranicama (Azure max 32); "thin" poruke iz jedne
+    # stranice se učitavaju jednim GET /orders/batch pozivom
+    RECEIVE_BATCH_SIZE = int(os.getenv('RECEIVE_BATCH_SIZE', '16'))
+
+    # 'platypus', 'canvas' (eksplicitne koordinate) ili 'compact' (canvas sa manje
+    # PDF operatora po redu; od 7 strana zaglavlje tabele i footer kao form XObject
+    # jednom po fakturi). 'template' je stari naziv za 'compact'.
+    PDF_RENDERER = os.getenv('PDF_RENDERER', 'platypus')
+
+    # Posle SIGTERM-a worker završava tekuću fakturu, šalje preostala
+    # ažuriranja i vraća ostale poruke u red; posle ovog roka izlazi u svakom slučaju
+    SHUTDOWN_GRACE_SECONDS = int(os.getenv('SHUTDOWN_GRACE_SECONDS', '25'))
+
+    # /metrics endpoint (dužina reda, starost najstarije poruke, brzina obrade)
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+    QUEUE_METRICS_INTERVAL_SECONDS = int(os.getenv('QUEUE_METRICS_INTERVAL_SECONDS', '15'))
+
+    # Tracing (tracing.py): OTLP/JSON span-ovi u fajl i/ili na collector;
+    # bez oba se traceparent i dalje prenosi, ali se span-ovi ne izvoze
+    TRACE_EXPORT_FILE = os.getenv('TRACE_EXPORT_FILE', '')
+    TRACE_COLLECTOR_URL = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', '')
+    TRACE_SAMPLE_RATIO = float(os.getenv('TRACE_SAMPLE_RATIO', '1.0'))
+
+    # GET /admin/profile na METRICS_PORT-u (profiler.py); bez tokena nije registrovan
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+
+    # Vidljivost poruke tokom obrade; heartbeat je produžava dok posao traje
+    VISIBILITY_TIMEOUT_SECONDS = int(os.getenv('VISIBILITY_TIMEOUT_SECONDS', '30'))
+    VISIBILITY_RENEW_INTERVAL_SECONDS = int(os.getenv('VISIBILITY_RENEW_INTERVAL_SECONDS', '10'))
+    # Thin poruke se pri nedostupnom Order Service-u vraćaju u red sa vidljivošću
+    # VISIBILITY_TIMEOUT_SECONDS * 2^(pokušaj-1), najviše ovoliko sekundi
+    HYDRATION_RETRY_MAX_SECONDS = int(os.getenv('HYDRATION_RETRY_MAX_SECONDS', '300'))
+
+    @staticmethod
+    def get_order_db_params():
+        return {
+            'host': Config.ORDER_DB_HOST,
+            'port': Config.ORDER_DB_PORT,
+            'dbname': Config.ORDER_DB_NAME,
+            'user': Config.ORDER_DB_USER,
+            'password': Config.ORDER_DB_PASSWORD
+        }
@@ -0,0 +1,19 @@
+"""
+Invoice Hash
+Hash sadržaja fakture, zajednički za worker i regenerate.py; čuva se u
+metapodacima bloba da bi se ponovljena isporuka prepoznala bez renderovanja.
+"""
+import json
+import hashlib
+
+# Polja poruke koja završe na fakturi
+INVOICE_FIELDS = (
+    'order_id', 'order_number', 'customer_id', 'customer_name',
+    'items', 'total_price', 'created_at'
+)
+
+
+def invoice_content_hash(message_data):
+    payload = {field: message_data.get(field) for field in INVOICE_FIELDS}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
@@ -0,0 +1,105 @@
+"""
+Message Lease
+Produžava vidljivost poruke u redu (heartbeat) dok se faktura obrađuje,
+kako druga replika ne bi preuzela istu poruku
+"""
+import logging
+import threading
+from azure.core.exceptions import ResourceNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+class MessageLease:
+
+    def __init__(self, queue_client, message, visibility_timeout, renew_interval):
+        self.queue_client = queue_client
+        self.message_id = message.id
+        self.pop_receipt = message.pop_receipt
+        self.visibility_timeout = visibility_timeout
+        self.renew_interval = renew_interval
+        self.lost = False
+        self.completed = False
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"lease-{self.message_id}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.renew_interval):
+            self.renew()
+
+    def renew(self):
+        with self._lock:
+            if self._stopped.is_set():
+                return
+            try:
+                updated = self.queue_client.update_message(
+                    self.message_id,
+                    pop_receipt=self.pop_receipt,
+                    visibility_timeout=self.visibility_timeout
+                )
+                self.pop_receipt = updated.pop_receipt
+                logger.debug(f"Lease for message {self.message_id} renewed")
+            except ResourceNotFoundError:
+                # Poruka je obrisana ili ju je preuzeo neko drugi
+                logger.warning(f"Lease for message {self.message_id} lost")
+                self.lost = True
+                self._stopped.set()
+            except Exception as e:
+                logger.warning(f"Failed to renew lease for message {self.message_id}: {e}")
+
+    @property
+    def active(self):
+        """Heartbeat još traje: poruka je u obradi ovog worker-a."""
+        return self._thread is not None and not self._stopped.is_set()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def complete(self):
+        """Zaustavlja heartbeat i briše poruku iz reda."""
+        self.stop()
+        with self._lock:
+            self.queue_client.delete_message(self.message_id, self.pop_receipt)
+            self.completed = True
+
+    def release(self, visibility_timeout=0):
+        """
+        Zaustavlja heartbeat i vraća poruku u red: odmah (vidljivost 0), da je
+        druga replika preuzme bez čekanja na istek vidljivosti, ili posle
+        visibility_timeout sekundi.
+        """
+        if not self.active:
+            return False
+        self.stop()
+        with self._lock:
+            try:
+                self.queue_client.update_message(
+                    self.message_id,
+                    pop_receipt=self.pop_receipt,
+                    visibility_timeout=visibility_timeout
+                )
+            except ResourceNotFoundError:
+                self.lost = True
+                return False
+        logger.info(f"Message {self.message_id} released back to the queue"
+                    + (f" for {visibility_timeout}s" if visibility_timeout else ""))
+        return True
@@ -0,0 +1,209 @@
+"""
+Worker Metrics
+Dužina svakog reda (lane-a), starost najstarije poruke, brzina obrade,
+kašnjenje po lane-u i trajanje faza obrade fakture na HTTP endpointu
+(/metrics, Prometheus format); KEDA na osnovu ukupnog backlog-a skalira
+broj replika.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+)
+
+logger = logging.getLogger(__name__)
+
+# Faze obrade fakture; queue_wait i end_to_end se mere od created_at iz poruke
+STAGES = ('queue_wait', 'render', 'upload', 'callback', 'end_to_end')
+
+
+class WorkerMetrics:
+
+    def __init__(self, rate_window_seconds=60):
+        self.registry = CollectorRegistry()
+        self.queue_length = Gauge(
+            'invoice_queue_length',
+            'Approximate number of messages in the queue',
+            ['queue'], registry=self.registry
+        )
+        self.backlog = Gauge(
+            'invoice_backlog',
+            'Approximate number of messages across all invoice queues',
+            registry=self.registry
+        )
+        self.oldest_message_age = Gauge(
+            'invoice_queue_oldest_message_age_seconds',
+            'Age of the oldest visible message in the queue',
+            ['queue'], registry=self.registry
+        )
+        self.messages = Counter(
+            'invoice_messages',
+            'Queue messages handled by this worker',
+            ['queue', 'result'], registry=self.registry
+        )
+        self.latency = Histogram(
+            'invoice_latency_seconds',
+            'Time from enqueue to completed invoice, per queue (lane)',
+            ['queue'], registry=self.registry,
+            buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+        )
+        self.stage_seconds = Histogram(
+            'invoice_stage_seconds',
+            'Duration of each invoice pipeline stage',
+            ['stage'], registry=self.registry,
+            buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+        )
+        # Label child-ovi se prave unapred, da observe u petlji ne traži labele
+        self.stages = {stage: self.stage_seconds.labels(stage=stage) for stage in STAGES}
+        self.pdf_size = Histogram(
+            'invoice_pdf_size_bytes',
+            'Size of rendered invoice PDFs',
+            registry=self.registry,
+            buckets=(8192, 16384, 32768, 65536, 131072, 262144, 524288,
+                     1048576, 4194304, 16777216)
+        )
+        self.processing_rate = Gauge(
+            'invoice_processing_rate',
+            f'Messages completed per second over the last {rate_window_seconds}s',
+            registry=self.registry
+        )
+        self.processing_rate.set_function(self.current_rate)
+
+        self.rate_window_seconds = rate_window_seconds
+        self._completed = deque()
+        self._lock = threading.Lock()
+
+    def record(self, queue, result, latency=None):
+        """result: 'success', 'failed', 'poisoned' ili 'deferred'; latency od ubacivanja u red."""
+        self.messages.labels(queue=queue, result=result).inc()
+        if latency is not None:
+            self.latency.labels(queue=queue).observe(latency)
+        if result == 'success':
+            with self._lock:
+                self._completed.append(time.monotonic())
+
+    def observe_stage(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def current_rate(self):
+        cutoff = time.monotonic() - self.rate_window_seconds
+        with self._lock:
+            while self._completed and self._completed[0] < cutoff:
+                self._completed.popleft()
+            return len(self._completed) / self.rate_window_seconds
+
+    def render(self):
+        return generate_latest(self.registry)
+
+
+class QueueMonitor:
+    """Periodično čita dužinu i starost najstarije poruke za svaki red."""
+
+    def __init__(self, queue_clients, metrics, interval):
+        self.queue_clients = queue_clients
+        self.metrics = metrics
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='queue-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.poll()
+            self._stopped.wait(self.interval)
+
+    def poll(self):
+        backlog = 0
+        for queue_client in self.queue_clients:
+            backlog += self._poll_queue(queue_client)
+        self.metrics.backlog.set(backlog)
+
+    def _poll_queue(self, queue_client):
+        queue_name = queue_client.queue_name
+        try:
+            properties = queue_client.get_queue_properties()
+            length = properties.approximate_message_count or 0
+            self.metrics.queue_length.labels(queue=queue_name).set(length)
+
+            # peek ne menja vidljivost poruke; poruke u obradi se ne vide
+            oldest = next(iter(queue_client.peek_messages(max_messages=1)), None)
+            age = 0.0
+            if oldest is not None and oldest.inserted_on:
+                age = (datetime.now(timezone.utc) - oldest.inserted_on).total_seconds()
+            self.metrics.oldest_message_age.labels(queue=queue_name).set(max(age, 0.0))
+            return length
+        except Exception as e:
+            logger.warning(f"Could not read metrics for queue '{queue_name}': {e}")
+            return 0
+
+
+class MetricsServer:
+    """
+    Mali HTTP server za operativne endpointe worker-a. Rute se registruju
+    preko add_route(path, handler); handler dobija zahtev (path, headers) i
+    vraća (status, content_type, body) ili (status, content_type, body, headers).
+    """
+
+    def __init__(self, port, metrics, host='0.0.0.0'):
+        self.routes = {
+            '/metrics': lambda request: (200, CONTENT_TYPE_LATEST, metrics.render()),
+            '/health': lambda request: (200, 'text/plain', b'ok'),
+        }
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                handler = routes.get(self.path.split('?')[0])
+                if handler is None:
+                    response = 404, 'text/plain', b'not found'
+                else:
+                    try:
+                        response = handler(self)
+                    except Exception as e:
+                        logger.error(f"Error serving {self.path}: {e}")
+                        response = 500, 'text/plain', b'internal error'
+                status, content_type, body = response[:3]
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (response[3] if len(response) > 3 else {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def add_route(self, path, handler):
+        self.routes[path] = handler
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name='metrics-server', daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Metrics endpoint listening on :{self.port}/metrics")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,126 @@
+"""
+Order Service Client
+Pooled requests.Session ka Order Service-u i batcher koji grupiše
+ažuriranja faktura u jedan POST /orders/invoices poziv
+"""
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+class OrderServiceClient:
+
+    def __init__(self, base_url, pool_size=10):
+        self.base_url = base_url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_order(self, order_id):
+        try:
+            response = self.session.get(
+                f"{self.base_url}/orders/{order_id}",
+                headers=tracing.trace_headers(),
+                timeout=10
+            )
+            if response.status_code == 200:
+                return response.json().get('order')
+            logger.warning(f"Could not fetch order {order_id}: {response.status_code}")
+            return None
+        except Exception as e:
+            logger.warning(f"Error fetching order {order_id} from Order Service: {e}")
+            return None
+
+    def get_orders(self, order_ids):
+        """
+        Više narudžbina jednim GET /orders/batch pozivom; vraća {id: narudžbina}.
+        Narudžbine kojih nema u bazi izostaju, a nedostupan Order Service je
+        izuzetak, da ga pozivalac ne bi pomešao sa nepostojećim narudžbinama.
+        """
+        if not order_ids:
+            return {}
+        response = self.session.get(
+            f"{self.base_url}/orders/batch",
+            params={'ids': ','.join(str(order_id) for order_id in order_ids)},
+            timeout=10
+        )
+        if response.status_code != 200:
+            raise Exception(f"Order batch fetch failed: {response.status_code}")
+        return {order['id']: order for order in response.json().get('orders', [])}
+
+    def update_invoices(self, invoices):
+        """
+        invoices: [{'order_id': 1, 'pdf_url': '...', 'status': 'completed'}]
+        Vraća skup ID-jeva narudžbina koje su ažurirane.
+        """
+        response = self.session.post(
+            f"{self.base_url}/orders/invoices",
+            json={'invoices': invoices},
+            timeout=10
+        )
+        if response.status_code != 200:
+            raise Exception(f"Bulk invoice update failed: {response.text}")
+        return {order['id'] for order in response.json().get('orders', [])}
+
+
+class InvoiceCallbackBatcher:
+    """
+    Skuplja ažuriranja faktura i šalje ih kada se skupi max_batch_size
+    stavki ili kada najstarija čeka duže od flush_interval sekundi.
+    """
+
+    def __init__(self, order_client, max_batch_size=20, flush_interval=2.0, on_flush=None):
+        self.order_client = order_client
+        # on_flush(seconds, batch_size) posle svakog poziva Order Service-u
+        self.on_flush = on_flush
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._oldest = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, order_id, pdf_url, on_success=None, on_failure=None):
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append((order_id, pdf_url, on_success, on_failure))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+
+    def flush_if_due(self):
+        if self._pending and time.monotonic() - self._oldest >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+
+        started = time.perf_counter()
+        try:
+            updated = self.order_client.update_invoices([
+                {'order_id': order_id, 'pdf_url': pdf_url, 'status': 'completed'}
+                for order_id, pdf_url, _, _ in batch
+            ])
+            logger.info(f"Invoice batch sent: {len(updated)}/{len(batch)} orders updated")
+        except Exception as e:
+            logger.error(f"Error calling Order Service API: {e}")
+            updated = set()
+
+        if self.on_flush is not None:
+            self.on_flush(time.perf_counter() - started, len(batch))
+
+        for order_id, _, on_success, on_failure in batch:
+            callback = on_success if order_id in updated else on_failure
+            if callback is None:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Invoice callback for order {order_id} failed: {e}")
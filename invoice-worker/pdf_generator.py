@@ -13,14 +13,21 @@ from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
 )
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from config import Config
 
 logger = logging.getLogger(__name__)
 
 
-def generate_invoice_pdf(order_data):
+def generate_invoice_pdf(order_data, renderer=None):
     """
     Generiše PDF fakturu i vraća bytes.
 
+    renderer: 'platypus' (podrazumevano), 'canvas' ili 'compact' ('template' je
+    stari naziv za 'compact'); ako nije prosleđen, koristi se Config.PDF_RENDERER.
+
     order_data: {
         'order_id': 1,
         'order_number': 'ORD-20260101-ABC123',
@@ -39,12 +46,50 @@ def generate_invoice_pdf(order_data):
         'created_at': '2026-01-01T10:00:00'
     }
     """
-    logger.info(f"Generating PDF for order {order_data['order_number']}")
-
     buffer = io.BytesIO()
+    render_invoice_pdf(order_data, buffer, renderer)
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def render_invoice_pdf(order_data, output, renderer=None):
+    """
+    Renderuje PDF fakturu direktno u `output` (binarni fajl-like objekat, npr.
+    TemporaryFile) i vraća broj upisanih bajtova.
+    """
+    renderer = renderer or Config.PDF_RENDERER
+    renderer = RENDERER_ALIASES.get(renderer, renderer)
+    if renderer not in RENDERERS:
+        raise ValueError(
+            f"Unknown PDF renderer '{renderer}'. Must be one of: {sorted(RENDERERS)}"
+        )
+
+    logger.info(f"Generating PDF for order {order_data['order_number']} ({renderer})")
+
+    start = output.tell()
+    RENDERERS[renderer](order_data, output)
+    size = output.tell() - start
+
+    logger.info(f"PDF generated successfully ({size} bytes)")
+    return size
+
 
+def _format_invoice_date(order_data):
+    created_at = order_data.get('created_at', datetime.utcnow().isoformat())
+    if isinstance(created_at, str):
+        try:
+            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+            return dt.strftime('%d.%m.%Y %H:%M')
+        except Exception:
+            return created_at
+    return datetime.utcnow().strftime('%d.%m.%Y %H:%M')
+
+
+def _render_platypus(order_data, output):
+    """Platypus renderer: Table sa Paragraph-om po ćeliji."""
     doc = SimpleDocTemplate(
-        buffer,
+        output,
         pagesize=A4,
         rightMargin=2*cm,
         leftMargin=2*cm,
@@ -113,15 +158,7 @@ def generate_invoice_pdf(order_data):
     elements.append(Spacer(1, 0.3*cm))
 
     # Datum
-    created_at = order_data.get('created_at', datetime.utcnow().isoformat())
-    if isinstance(created_at, str):
-        try:
-            dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            formatted_date = dt.strftime('%d.%m.%Y %H:%M')
-        except Exception:
-            formatted_date = created_at
-    else:
-        formatted_date = datetime.utcnow().strftime('%d.%m.%Y %H:%M')
+    formatted_date = _format_invoice_date(order_data)
 
     elements.append(Paragraph(f"Datum: {formatted_date}", subtitle_style))
     elements.append(Spacer(1, 0.5*cm))
@@ -251,8 +288,371 @@ def generate_invoice_pdf(order_data):
     ))
 
     doc.build(elements)
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
 
-    logger.info(f"PDF generated successfully ({len(pdf_bytes)} bytes)")
-    return pdf_bytes
+
+# ── Canvas renderer ──────────────────────────────────────
+# Iste dimenzije kao Platypus layout iznad, ali sa eksplicitnim koordinatama.
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 2*cm
+FRAME_PADDING = 6
+FRAME_LEFT = MARGIN + FRAME_PADDING
+FRAME_WIDTH = PAGE_WIDTH - 2*MARGIN - 2*FRAME_PADDING
+FRAME_TOP = PAGE_HEIGHT - MARGIN - FRAME_PADDING
+FRAME_BOTTOM = MARGIN + FRAME_PADDING
+
+COLOR_DARK = colors.HexColor('#1a1a2e')
+COLOR_ACCENT = colors.HexColor('#4a90e2')
+COLOR_SUBTLE = colors.HexColor('#666666')
+COLOR_LABEL = colors.HexColor('#999999')
+COLOR_GRID = colors.HexColor('#dee2e6')
+COLOR_ROW_ALT = colors.HexColor('#f8f9fa')
+COLOR_PAID = colors.HexColor('#27ae60')
+
+ITEM_COL_WIDTHS = [2.5*cm, 6.5*cm, 1.5*cm, 2.5*cm, 2.5*cm]
+ITEM_COL_ALIGN = ['left', 'left', 'center', 'right', 'right']
+ITEM_HEADERS = ['ŠIFRA', 'NAZIV PROIZVODA', 'KOL.', 'JED. CENA', 'UKUPNO']
+ITEMS_WIDTH = sum(ITEM_COL_WIDTHS)
+ITEMS_LEFT = FRAME_LEFT + (FRAME_WIDTH - ITEMS_WIDTH) / 2
+CELL_PAD_X = 8
+CELL_PAD_Y = 6
+CELL_FONT_SIZE = 9
+CELL_LEADING = 12
+
+# Širina sekcija sa dve/tri kolone (header, kupac, ukupno) je 17cm
+WIDE_WIDTH = 17*cm
+WIDE_LEFT = FRAME_LEFT + (FRAME_WIDTH - WIDE_WIDTH) / 2
+
+TOTAL_BLOCK_HEIGHT = 0.5*cm + 34
+FOOTER_BLOCK_HEIGHT = 1*cm + 0.3*cm + 12
+
+
+def _draw_aligned(c, text, x, width, baseline, align):
+    if align == 'right':
+        c.drawRightString(x + width - CELL_PAD_X, baseline, text)
+    elif align == 'center':
+        c.drawCentredString(x + width / 2, baseline, text)
+    else:
+        c.drawString(x + CELL_PAD_X, baseline, text)
+
+
+def _split_cell(text, font, width):
+    """Jednolinijske ćelije ostaju bez prelamanja (brzi put)."""
+    available = width - 2*CELL_PAD_X
+    if stringWidth(text, font, CELL_FONT_SIZE) <= available:
+        return [text]
+    return simpleSplit(text, font, CELL_FONT_SIZE, available) or ['']
+
+
+def _draw_table_row(c, y, cells, fonts, row_height, background, text_color):
+    c.setFillColor(background)
+    c.setStrokeColor(COLOR_GRID)
+    c.setLineWidth(0.5)
+    c.rect(ITEMS_LEFT, y - row_height, ITEMS_WIDTH, row_height, stroke=1, fill=1)
+
+    x = ITEMS_LEFT
+    c.setFillColor(text_color)
+    for lines, font, width, align in zip(cells, fonts, ITEM_COL_WIDTHS, ITEM_COL_ALIGN):
+        if x > ITEMS_LEFT:
+            c.line(x, y, x, y - row_height)
+        c.setFont(font, CELL_FONT_SIZE)
+        block_height = len(lines) * CELL_LEADING
+        baseline = y - (row_height - block_height) / 2 - CELL_FONT_SIZE
+        for line in lines:
+            _draw_aligned(c, line, x, width, baseline, align)
+            baseline -= CELL_LEADING
+        x += width
+
+
+def _draw_items_header(c, y):
+    cells = [[h] for h in ITEM_HEADERS]
+    fonts = ['Helvetica-Bold'] * len(ITEM_HEADERS)
+    row_height = CELL_LEADING + 2*CELL_PAD_Y
+    _draw_table_row(c, y, cells, fonts, row_height, COLOR_DARK, colors.white)
+    return y - row_height
+
+
+# Naslovni blok ima fiksnu visinu, pa su pozicije na prvoj strani konstantne
+TITLE_TOP = FRAME_TOP
+DATE_TOP = TITLE_TOP - 30 - 0.3*cm
+RULE_TOP = DATE_TOP - 12 - 0.5*cm
+CUSTOMER_TOP = RULE_TOP - 2 - 0.5*cm
+CUSTOMER_LEFT = WIDE_LEFT + 12
+STATUS_LEFT = WIDE_LEFT + 9*cm + 12
+HEADING_BOTTOM = CUSTOMER_TOP - 54 - 0.8*cm
+
+
+def _draw_heading_static(c):
+    """Delovi naslovnog bloka koji su isti za svaku fakturu."""
+    c.setFillColor(COLOR_DARK)
+    c.setFont('Helvetica-Bold', 24)
+    c.drawString(WIDE_LEFT + 6, TITLE_TOP - 22, "FAKTURA")
+
+    c.setStrokeColor(COLOR_ACCENT)
+    c.setLineWidth(2)
+    c.line(FRAME_LEFT, RULE_TOP - 1, FRAME_LEFT + FRAME_WIDTH, RULE_TOP - 1)
+
+    c.setFillColor(COLOR_LABEL)
+    c.setFont('Helvetica', 8)
+    c.drawString(CUSTOMER_LEFT, CUSTOMER_TOP - 11, "KUPAC")
+    c.drawString(STATUS_LEFT, CUSTOMER_TOP - 11, "STATUS")
+
+    c.setFillColor(COLOR_PAID)
+    c.setFont('Helvetica-Bold', 10)
+    c.drawString(STATUS_LEFT, CUSTOMER_TOP - 29, "PLAĆENO")
+
+
+def _draw_heading_fields(c, order_data):
+    """Promenljiva polja naslovnog bloka: broj narudžbine, datum, kupac."""
+    c.setFillColor(COLOR_ACCENT)
+    c.setFont('Helvetica-Bold', 14)
+    c.drawRightString(WIDE_LEFT + WIDE_WIDTH - 6, TITLE_TOP - 20,
+                      f"#{order_data['order_number']}")
+
+    c.setFillColor(COLOR_SUBTLE)
+    c.setFont('Helvetica', 10)
+    c.drawString(FRAME_LEFT, DATE_TOP - 10, f"Datum: {_format_invoice_date(order_data)}")
+
+    c.setFillColor(COLOR_DARK)
+    c.setFont('Helvetica-Bold', 10)
+    c.drawString(CUSTOMER_LEFT, CUSTOMER_TOP - 29, order_data['customer_name'])
+
+    c.setFillColor(COLOR_SUBTLE)
+    c.setFont('Helvetica', 10)
+    c.drawString(CUSTOMER_LEFT, CUSTOMER_TOP - 47, f"ID: {order_data['customer_id']}")
+
+
+def _draw_totals(c, order_data, y):
+    y -= 0.5*cm
+    label_right = WIDE_LEFT + 14*cm - 6
+    value_right = WIDE_LEFT + WIDE_WIDTH - 6
+
+    c.setStrokeColor(COLOR_GRID)
+    c.setLineWidth(1)
+    c.line(WIDE_LEFT + 9*cm, y, WIDE_LEFT + WIDE_WIDTH, y)
+
+    c.setFillColor(COLOR_DARK)
+    c.setFont('Helvetica-Bold', 12)
+    c.drawRightString(label_right, y - 22, 'UKUPNO ZA UPLATU:')
+    c.setFillColor(COLOR_ACCENT)
+    c.setFont('Helvetica-Bold', 14)
+    c.drawRightString(value_right, y - 22, f"${float(order_data['total_price']):.2f}")
+    return y - 34
+
+
+def _draw_footer(c, y):
+    y -= 1*cm
+    c.setStrokeColor(COLOR_GRID)
+    c.setLineWidth(1)
+    c.line(FRAME_LEFT, y, FRAME_LEFT + FRAME_WIDTH, y)
+    y -= 0.3*cm
+
+    c.setFillColor(COLOR_LABEL)
+    c.setFont('Helvetica', 8)
+    c.drawCentredString(FRAME_LEFT + FRAME_WIDTH / 2, y - 8,
+                        "Hvala na poverenju! | Cloud Order System")
+    return y - 12
+
+
+def _item_rows(items):
+    """(ćelije, visina reda) za svaku stavku; ćelije se prelamaju po širini kolone."""
+    for item in items:
+        cells = [
+            _split_cell(item.get('product_code', ''), 'Helvetica', ITEM_COL_WIDTHS[0]),
+            _split_cell(item.get('product_name', ''), 'Helvetica', ITEM_COL_WIDTHS[1]),
+            [str(item.get('quantity', 0))],
+            [f"${float(item.get('unit_price', 0)):.2f}"],
+            [f"${float(item.get('total_price', 0)):.2f}"],
+        ]
+        yield cells, max(len(cell) for cell in cells) * CELL_LEADING + 2*CELL_PAD_Y
+
+
+def _draw_item_rows(c, rows, y, bottom, next_page, draw_row=_draw_table_row):
+    """Crta redove stavki; kada red ne staje iznad `bottom`, poziva next_page()."""
+    row_fonts = ['Helvetica', 'Helvetica', 'Helvetica', 'Helvetica', 'Helvetica-Bold']
+    for i, (cells, row_height) in enumerate(rows):
+        if y - row_height < bottom:
+            y = next_page()
+
+        background = colors.white if i % 2 == 0 else COLOR_ROW_ALT
+        draw_row(c, y, cells, row_fonts, row_height, background, COLOR_DARK)
+        y -= row_height
+    return y
+
+
+def _render_canvas(order_data, output):
+    """
+    Canvas renderer: eksplicitne koordinate, drawString za jednolinijske
+    ćelije i ručna paginacija sa ponavljanjem zaglavlja tabele.
+    """
+    c = canvas.Canvas(output, pagesize=A4)
+    c.setTitle(f"Faktura {order_data['order_number']}")
+
+    _draw_heading_static(c)
+    _draw_heading_fields(c, order_data)
+    y = _draw_items_header(c, HEADING_BOTTOM)
+
+    def next_page():
+        c.showPage()
+        return _draw_items_header(c, FRAME_TOP)
+
+    y = _draw_item_rows(c, _item_rows(order_data['items']), y, FRAME_BOTTOM, next_page)
+
+    if y - TOTAL_BLOCK_HEIGHT - FOOTER_BLOCK_HEIGHT < FRAME_BOTTOM:
+        c.showPage()
+        y = FRAME_TOP
+
+    y = _draw_totals(c, order_data, y)
+    _draw_footer(c, y)
+
+    c.showPage()
+    c.save()
+
+
+# ── Compact renderer ─────────────────────────────────────
+# Footer je zakucan na dno strane, pa je statički sloj isti na svakoj strani.
+
+HEADER_ROW_HEIGHT = CELL_LEADING + 2*CELL_PAD_Y
+COMPACT_FOOTER_TOP = FRAME_BOTTOM + 0.3*cm + 12
+COMPACT_CONTENT_BOTTOM = COMPACT_FOOTER_TOP + 0.5*cm
+COMPACT_FORM_MIN_PAGES = 7
+
+
+def _aligned_x(text, font, x, width, align):
+    if align == 'right':
+        return x + width - CELL_PAD_X - stringWidth(text, font, CELL_FONT_SIZE)
+    if align == 'center':
+        return x + (width - stringWidth(text, font, CELL_FONT_SIZE)) / 2
+    return x + CELL_PAD_X
+
+
+def _draw_compact_row(c, y, cells, fonts, row_height, background, text_color):
+    """
+    Isti izgled kao _draw_table_row sa manje PDF operatora: okvir i linije
+    kolona su jedna putanja (beli red se ne popunjava), a tekst celog reda je
+    jedan BT/ET blok sa relativnim pomerajima (Td) umesto Tm po ćeliji.
+    """
+    c.setStrokeColor(COLOR_GRID)
+    c.setLineWidth(0.5)
+    path = c.beginPath()
+    path.rect(ITEMS_LEFT, y - row_height, ITEMS_WIDTH, row_height)
+    x = ITEMS_LEFT
+    for width in ITEM_COL_WIDTHS[:-1]:
+        x += width
+        path.moveTo(x, y)
+        path.lineTo(x, y - row_height)
+    filled = background != colors.white
+    if filled:
+        c.setFillColor(background)
+    c.drawPath(path, stroke=1, fill=int(filled))
+
+    c.setFillColor(text_color)
+    text = None
+    current_font = None
+    x = ITEMS_LEFT
+    for lines, font, width, align in zip(cells, fonts, ITEM_COL_WIDTHS, ITEM_COL_ALIGN):
+        block_height = len(lines) * CELL_LEADING
+        baseline = y - (row_height - block_height) / 2 - CELL_FONT_SIZE
+        for line in lines:
+            line_x = _aligned_x(line, font, x, width, align)
+            if text is None:
+                text = c.beginText(line_x, baseline)
+            else:
+                # moveCursor meri dy naniže, od početka prethodne linije
+                text.moveCursor(line_x - line_origin[0], line_origin[1] - baseline)
+            line_origin = (line_x, baseline)
+            if font != current_font:
+                text.setFont(font, CELL_FONT_SIZE, CELL_LEADING)
+                current_font = font
+            text.textOut(line)
+            baseline -= CELL_LEADING
+        x += width
+    if text is not None:
+        c.drawText(text)
+
+
+def _compact_page_count(rows):
+    """Broj strana za redove `rows`, istom paginacijom kao _render_compact."""
+    pages, y = 1, HEADING_BOTTOM - HEADER_ROW_HEIGHT
+    for _, row_height in rows:
+        if y - row_height < COMPACT_CONTENT_BOTTOM:
+            pages += 1
+            y = FRAME_TOP - HEADER_ROW_HEIGHT
+        y -= row_height
+    if y - TOTAL_BLOCK_HEIGHT < COMPACT_CONTENT_BOTTOM:
+        pages += 1
+    return pages
+
+
+def _render_compact(order_data, output):
+    """
+    Compact renderer: redovi stavki se crtaju sa manje PDF operatora
+    (_draw_compact_row), a zaglavlje tabele i footer koji se ponavljaju na
+    svakoj strani se u dužim fakturama definišu jednom po dokumentu, kao form
+    XObject-i (beginForm/doForm), i svaka strana ih crta jednim Do operatorom.
+    Form XObject ima svoj rečnik i stream, pa se isplati tek od
+    COMPACT_FORM_MIN_PAGES strana; kraće fakture statički sloj crtaju direktno.
+    Svaki PDF je samostalan dokument, pa se statički sloj ne deli između
+    faktura: zaglavlje i forme se prave iznova za svaku fakturu.
+    """
+    c = canvas.Canvas(output, pagesize=A4)
+    c.setTitle(f"Faktura {order_data['order_number']}")
+    rows = list(_item_rows(order_data['items']))
+    use_forms = _compact_page_count(rows) >= COMPACT_FORM_MIN_PAGES
+    defined_forms = set()
+
+    def draw_form(name, draw, y=0):
+        if name not in defined_forms:
+            c.beginForm(name)
+            draw(c)
+            c.endForm()
+            defined_forms.add(name)
+        c.saveState()
+        c.translate(0, y)
+        c.doForm(name)
+        c.restoreState()
+
+    def draw_page_static(header_top=None):
+        """Footer i, ako je zadat header_top, zaglavlje tabele; vraća vrh prvog reda."""
+        if not use_forms:
+            _draw_footer(c, COMPACT_FOOTER_TOP + 1*cm)
+            return _draw_items_header(c, header_top) if header_top is not None else None
+        draw_form('InvoiceFooter', lambda c: _draw_footer(c, COMPACT_FOOTER_TOP + 1*cm))
+        if header_top is None:
+            return None
+        # Zaglavlje tabele je u formi nacrtano od y=0 i pomera se na header_top
+        draw_form('InvoiceItemsHeader', lambda c: _draw_items_header(c, HEADER_ROW_HEIGHT),
+                  header_top - HEADER_ROW_HEIGHT)
+        return header_top - HEADER_ROW_HEIGHT
+
+    _draw_heading_static(c)
+    _draw_heading_fields(c, order_data)
+    y = draw_page_static(HEADING_BOTTOM)
+
+    def next_page():
+        c.showPage()
+        return draw_page_static(FRAME_TOP)
+
+    y = _draw_item_rows(c, rows, y, COMPACT_CONTENT_BOTTOM, next_page, draw_row=_draw_compact_row)
+
+    if y - TOTAL_BLOCK_HEIGHT < COMPACT_CONTENT_BOTTOM:
+        c.showPage()
+        draw_page_static()
+        y = FRAME_TOP
+
+    _draw_totals(c, order_data, y)
+
+    c.showPage()
+    c.save()
+
+
+RENDERERS = {
+    'platypus': _render_platypus,
+    'canvas': _render_canvas,
+    'compact': _render_compact,
+}
+
+# Raniji nazivi renderera, da postojeća PDF_RENDERER podešavanja i dalje rade
+RENDERER_ALIASES = {
+    'template': 'compact',
+}
@@ -0,0 +1,219 @@
+"""
+Profiler
+Sampling profiler za pod u produkciji: GET /admin/profile?seconds=10 uzorkuje
+stekove svih thread-ova procesa (sys._current_frames) i vraća ih u collapsed
+formatu ("a;b;c 4200" po liniji, vrednost su mikrosekunde), koji direktno
+čitaju flamegraph.pl, speedscope i inferno. Zahtev mora imati
+"Authorization: Bearer <ADMIN_TOKEN>"; bez podešenog tokena endpoint ne postoji.
+
+Profiliše se proces koji je primio zahtev (jedan gunicorn worker, pid je u
+X-Profile-Pid zaglavlju), najlakše direktno na pod (invoice worker na 9100):
+  kubectl port-forward <pod> 5002
+  curl -H "Authorization: Bearer $ADMIN_TOKEN" localhost:5002/admin/profile?seconds=30
+
+Uzorkovanje radi poseban OS thread (i pod gevent-om). U 'cpu' modu
+(podrazumevano) steku se pripisuje CPU vreme koje je thread potrošio od
+prethodnog uzorka, pa thread-ovi koji čekaju na bazu, mrežu ili posao ne
+zatrpavaju rezultat; 'wall' mod pripisuje proteklo vreme svim thread-ovima.
+Pod gevent-om se vidi samo greenlet koji se u trenutku uzorka izvršava, što
+je upravo kod koji troši CPU. Cena je jedan prolaz kroz stekove na svakih
+interval_ms, a istovremeno radi najviše jedno profilisanje po procesu.
+
+Isti modul postoji u order-service, catalog-service i invoice-worker.
+"""
+import os
+import sys
+import hmac
+import time
+import threading
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_SECONDS = 10
+DEFAULT_INTERVAL_MS = 10
+MODES = ('cpu', 'wall')
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _original(module, name):
+    """Originalna funkcija i kad je gevent monkey-patch-ovao modul."""
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched(module):
+            return monkey.get_original(module, name)
+    return getattr(__import__(module), name)
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    marker = filename.rfind('site-packages' + os.sep)
+    if marker >= 0:
+        filename = filename[marker + len('site-packages') + 1:]
+    else:
+        filename = os.path.basename(filename)
+    # ';' razdvaja okvire u collapsed formatu
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+def _thread_cpu_clock(ident):
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+class Profiler:
+
+    def __init__(self, max_seconds):
+        self.max_seconds = max_seconds
+        self._running = threading.Lock()
+
+    def profile(self, seconds=DEFAULT_SECONDS, interval_ms=DEFAULT_INTERVAL_MS, mode='cpu'):
+        """
+        Uzorkuje seconds sekundi (najviše max_seconds) i vraća
+        (collapsed stekovi, broj uzoraka). ProfilerBusy ako profilisanje već traje.
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be between 0 and {self.max_seconds}")
+        if not 1 <= interval_ms <= 1000:
+            raise ValueError("interval_ms must be between 1 and 1000")
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running in this process")
+        try:
+            result = {}
+            # Poseban OS thread, ne greenlet: CPU-intenzivan greenlet ga ne zaustavlja
+            _original('_thread', 'start_new_thread')(
+                self._sample, (seconds, interval_ms / 1000, mode, result)
+            )
+            # time.sleep je pod gevent-om kooperativan, pa zahtev ne blokira ostale
+            while 'stacks' not in result:
+                time.sleep(0.05)
+            if 'error' in result:
+                raise result['error']
+            return result['stacks'], result['samples']
+        finally:
+            self._running.release()
+
+    def _sample(self, seconds, interval, mode, result):
+        sleep = _original('time', 'sleep')
+        own_ident = _original('_thread', 'get_ident')()
+        stacks = Counter()
+        samples = 0
+        cpu_clocks = {}
+        cpu_used = {}
+        try:
+            previous_sample = started = time.monotonic()
+            while True:
+                sleep(interval)
+                now = time.monotonic()
+                wall_us = int((now - previous_sample) * 1_000_000)
+                previous_sample = now
+                samples += 1
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    weight = wall_us
+                    if mode == 'cpu':
+                        if ident not in cpu_clocks:
+                            cpu_clocks[ident] = _thread_cpu_clock(ident)
+                        clock = cpu_clocks[ident]
+                        if clock is not None:
+                            try:
+                                used = time.clock_gettime_ns(clock) // 1000
+                            except OSError:
+                                continue  # thread je u međuvremenu završio
+                            previous = cpu_used.get(ident)
+                            cpu_used[ident] = used
+                            # CPU od prethodnog uzorka se pripisuje trenutnom steku
+                            weight = used - previous if previous is not None else 0
+                    if weight <= 0:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    stacks[';'.join(reversed(labels))] += weight
+                if now - started >= seconds:
+                    break
+            result['samples'] = samples
+        except Exception as e:
+            result['error'] = e
+        finally:
+            result['stacks'] = ''.join(
+                f"{stack} {count}\n" for stack, count in stacks.most_common()
+            )
+
+
+def authorized(authorization, token):
+    """Authorization zaglavlje "Bearer <token>", poređenje u konstantnom vremenu."""
+    if not token or not authorization:
+        return False
+    scheme, _, value = authorization.partition(' ')
+    if scheme.lower() != 'bearer':
+        return False
+    return hmac.compare_digest(value.strip().encode('utf-8'), token.encode('utf-8'))
+
+
+def parse_options(query):
+    """Query string (seconds, interval_ms, mode) -> argumenti za Profiler.profile."""
+    args = {key: values[-1] for key, values in parse_qs(query).items()}
+    try:
+        return {
+            'seconds': float(args.get('seconds', DEFAULT_SECONDS)),
+            'interval_ms': float(args.get('interval_ms', DEFAULT_INTERVAL_MS)),
+            'mode': args.get('mode', 'cpu'),
+        }
+    except ValueError:
+        raise ValueError("seconds and interval_ms must be numbers")
+
+
+def handle(profiler, token, authorization, query):
+    """Zajednička obrada za Flask i worker: vraća (status, content_type, body, headers)."""
+    if not authorized(authorization, token):
+        return 401, 'text/plain', b'unauthorized', {'WWW-Authenticate': 'Bearer'}
+    try:
+        stacks, samples = profiler.profile(**parse_options(query))
+    except ValueError as e:
+        return 400, 'text/plain', str(e).encode('utf-8'), {}
+    except ProfilerBusy as e:
+        return 409, 'text/plain', str(e).encode('utf-8'), {}
+    headers = {'X-Profile-Pid': str(os.getpid()), 'X-Profile-Samples': str(samples)}
+    return 200, 'text/plain; charset=utf-8', stacks.encode('utf-8'), headers
+
+
+def init_flask(app, token, max_seconds):
+    """GET /admin/profile; bez tokena se ruta ne registruje."""
+    if not token:
+        return None
+    from flask import Response, request
+
+    profiler = Profiler(max_seconds)
+
+    def admin_profile():
+        status, content_type, body, headers = handle(
+            profiler, token, request.headers.get('Authorization'),
+            request.query_string.decode('utf-8', 'replace')
+        )
+        return Response(body, status=status, content_type=content_type, headers=headers)
+
+    app.add_url_rule('/admin/profile', 'admin_profile', admin_profile, methods=['GET'])
+    return profiler
+
+
+def http_handler(token, max_seconds):
+    """Handler za MetricsServer.add_route (invoice worker)."""
+    profiler = Profiler(max_seconds)
+
+    def admin_profile(request):
+        status, content_type, body, headers = handle(
+            profiler, token, request.headers.get('Authorization'),
+            urlsplit(request.path).query
+        )
+        return status, content_type, body, headers
+
+    return admin_profile
@@ -0,0 +1,242 @@
+"""
+Bulk Invoice Regeneration
+Ponovo renderuje fakture za narudžbine kreirane u zadatom periodu (npr. posle
+izmene šablona), bez prolaska kroz red poruka.
+
+Narudžbine se čitaju direktno iz Order baze u stranicama (keyset po id-ju),
+PDF-ovi se renderuju u pool-u procesa, upload-uju paralelno, a pdf_url se
+ažurira jednim POST /orders/invoices pozivom po stranici: status narudžbine
+ostaje isti, a Order Service šalje NOTIFY pretplatnicima. Posle svake stranice se u checkpoint
+fajl upisuje poslednji obrađeni id, pa se prekinut posao nastavlja odatle.
+
+python regenerate.py --from 2026-01-01 --to 2026-02-01
+python regenerate.py --from 2026-01-01 --to 2026-02-01 --renderer compact --render-workers 8
+"""
+import os
+import io
+import json
+import time
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from config import Config
+from blob_storage import InvoiceBlobStorage
+from order_client import OrderServiceClient
+from pdf_generator import render_invoice_pdf
+from invoice_hash import invoice_content_hash
+
+logger = logging.getLogger('regenerate')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Regenerate invoices for a date range')
+    parser.add_argument('--from', dest='date_from', required=True, type=date.fromisoformat,
+                        help='first day (inclusive), YYYY-MM-DD')
+    parser.add_argument('--to', dest='date_to', required=True, type=date.fromisoformat,
+                        help='last day (exclusive), YYYY-MM-DD')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--render-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--upload-workers', type=int, default=16)
+    parser.add_argument('--renderer', default=Config.PDF_RENDERER)
+    parser.add_argument('--checkpoint', default='regenerate-checkpoint.json')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore an existing checkpoint and start from the beginning')
+    return parser.parse_args(argv)
+
+
+def load_checkpoint(path, date_from, date_to):
+    """Vraća poslednji obrađeni id i broj obrađenih faktura za isti period."""
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 0, 0
+
+    if checkpoint.get('from') != date_from.isoformat() or checkpoint.get('to') != date_to.isoformat():
+        raise ValueError(
+            f"Checkpoint {path} belongs to {checkpoint.get('from')}..{checkpoint.get('to')}; "
+            f"use --restart or another --checkpoint"
+        )
+    return checkpoint['last_id'], checkpoint.get('processed', 0)
+
+
+def save_checkpoint(path, date_from, date_to, last_id, processed):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            'last_id': last_id,
+            'processed': processed,
+            'updated_at': datetime.utcnow().isoformat()
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def count_orders(conn, date_from, date_to, after_id):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*) FROM orders
+            WHERE created_at >= %s AND created_at < %s AND id > %s
+        """, (date_from, date_to, after_id))
+        return cursor.fetchone()[0]
+
+
+def fetch_page(conn, date_from, date_to, after_id, limit):
+    """Jedna stranica narudžbina (sa stavkama) u formatu poruke iz reda."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            SELECT id, order_number, customer_id, customer_name, total_price, created_at
+            FROM orders
+            WHERE created_at >= %s AND created_at < %s AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (date_from, date_to, after_id, limit))
+        orders = cursor.fetchall()
+        if not orders:
+            return []
+
+        cursor.execute("""
+            SELECT order_id, product_code, product_name, quantity, unit_price, total_price
+            FROM order_items
+            WHERE order_id = ANY(%s)
+            ORDER BY order_id, id
+        """, ([order['id'] for order in orders],))
+        items = cursor.fetchall()
+
+    return build_invoice_messages(orders, items)
+
+
+def build_invoice_messages(orders, items):
+    items_by_order = {}
+    for item in items:
+        items_by_order.setdefault(item['order_id'], []).append({
+            'product_code': item['product_code'],
+            'product_name': item['product_name'],
+            'quantity': item['quantity'],
+            'unit_price': float(item['unit_price']),
+            'total_price': float(item['total_price'])
+        })
+
+    return [{
+        'order_id': order['id'],
+        'order_number': order['order_number'],
+        'customer_id': order['customer_id'],
+        'customer_name': order['customer_name'],
+        'items': items_by_order.get(order['id'], []),
+        'total_price': float(order['total_price']),
+        'created_at': order['created_at'].isoformat()
+    } for order in orders]
+
+
+def render_invoice(order_data, renderer):
+    """Izvršava se u procesu iz pool-a; vraća gotov PDF kao bytes."""
+    output = io.BytesIO()
+    render_invoice_pdf(order_data, output, renderer=renderer)
+    return output.getvalue()
+
+
+def upload_invoice(storage, order_data, pdf_data):
+    blob_client = storage.upload(
+        f"{order_data['order_number']}.pdf",
+        pdf_data,
+        metadata={'content_hash': invoice_content_hash(order_data)},
+        length=len(pdf_data)
+    )
+    return order_data['order_id'], storage.generate_read_url(blob_client)
+
+
+def update_pdf_urls(order_client, invoices):
+    """Menja samo pdf_url (status: None); vraća broj ažuriranih narudžbina."""
+    updated = order_client.update_invoices([
+        {'order_id': order_id, 'pdf_url': pdf_url, 'status': None}
+        for order_id, pdf_url in invoices
+    ])
+    if len(updated) < len(invoices):
+        logger.warning(f"{len(invoices) - len(updated)} orders were not found while updating pdf_url")
+    return len(updated)
+
+
+def regenerate_page(page, render_pool, upload_pool, storage, renderer, render_workers):
+    """
+    Renderovanje i upload se preklapaju: čim je PDF gotov, njegov upload
+    kreće u thread pool-u dok procesi renderuju ostatak stranice.
+    """
+    chunksize = max(1, len(page) // (render_workers * 4))
+    pdfs = render_pool.map(render_invoice, page, [renderer] * len(page), chunksize=chunksize)
+    uploads = [
+        upload_pool.submit(upload_invoice, storage, order_data, pdf_data)
+        for order_data, pdf_data in zip(page, pdfs)
+    ]
+    return [future.result() for future in uploads]
+
+
+def run(args):
+    date_from, date_to = args.date_from, args.date_to
+    last_id, processed = (0, 0) if args.restart else load_checkpoint(
+        args.checkpoint, date_from, date_to
+    )
+
+    storage = InvoiceBlobStorage(
+        Config.AZURE_STORAGE_CONNECTION_STRING,
+        Config.AZURE_BLOB_CONTAINER,
+        pool_size=args.upload_workers,
+        max_single_put_size=Config.BLOB_MAX_SINGLE_PUT_SIZE,
+        max_block_size=Config.BLOB_MAX_BLOCK_SIZE,
+        max_concurrency=1
+    )
+    storage.ensure_container()
+    order_client = OrderServiceClient(Config.ORDER_SERVICE_URL)
+
+    conn = psycopg2.connect(**Config.get_order_db_params())
+    remaining = count_orders(conn, date_from, date_to, last_id)
+    total = processed + remaining
+    logger.info(f"Regenerating {remaining} invoices ({date_from}..{date_to}), "
+                f"resuming after id {last_id}, renderer '{args.renderer}'")
+
+    started = time.monotonic()
+    done_this_run = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.render_workers) as render_pool, \
+                ThreadPoolExecutor(max_workers=args.upload_workers) as upload_pool:
+            while True:
+                page = fetch_page(conn, date_from, date_to, last_id, args.page_size)
+                conn.commit()
+                if not page:
+                    break
+
+                invoices = regenerate_page(page, render_pool, upload_pool, storage,
+                                           args.renderer, args.render_workers)
+                update_pdf_urls(order_client, invoices)
+
+                last_id = page[-1]['order_id']
+                processed += len(page)
+                done_this_run += len(page)
+                save_checkpoint(args.checkpoint, date_from, date_to, last_id, processed)
+
+                elapsed = time.monotonic() - started
+                rate = done_this_run / elapsed if elapsed else 0
+                eta = timedelta(seconds=int((total - processed) / rate)) if rate else '-'
+                logger.info(f"{processed}/{total} invoices ({rate:.1f}/s, ETA {eta}), "
+                            f"last id {last_id}")
+    finally:
+        conn.close()
+
+    logger.info(f"Done: {done_this_run} invoices regenerated in "
+                f"{time.monotonic() - started:.1f}s")
+    return done_this_run
+
+
+def main(argv=None):
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    run(parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
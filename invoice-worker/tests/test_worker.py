@@ -5,10 +5,29 @@ pytest invoice-worker/tests/test_worker.py
 import pytest
 import sys
 import os
+import json
+import subprocess
+import tempfile
+import time
+import threading
+import urllib.request
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from pdf_generator import generate_invoice_pdf
+from pdf_generator import generate_invoice_pdf, render_invoice_pdf
+import worker
+from message_lease import MessageLease
+from blob_storage import InvoiceBlobStorage
+from order_client import InvoiceCallbackBatcher
+import regenerate
+from metrics import WorkerMetrics, QueueMonitor, MetricsServer
+from lanes import Lane, LaneScheduler, parse_lane_weights
+from message_codec import encode_message, encode_payload, claim_check_reference, MessageDecodeError
+import tracing
+import profiler
 
 
 SAMPLE_ORDER = {
@@ -83,5 +102,585 @@ def test_pdf_generation_with_multiple_items():
     print(f"✅ Test 2 passed: PDF with 5 items generated ({len(pdf_bytes)} bytes)")
 
 
+def test_canvas_renderer_paginates_large_orders():
+    """
+    Test 3: Canvas renderer generiše validan PDF i prelama stranice
+    """
+    large_order = {
+        **SAMPLE_ORDER,
+        'order_number': 'ORD-20260101-TEST03',
+        'items': [
+            {
+                'product_code': f'PROD-{i:03d}',
+                'product_name': f'Proizvod sa dugim nazivom koji se prelama {i}',
+                'quantity': 1,
+                'unit_price': 1.00,
+                'total_price': 1.00
+            }
+            for i in range(100)
+        ],
+        'total_price': 100.00
+    }
+
+    pdf_bytes = generate_invoice_pdf(large_order, renderer='canvas')
+
+    assert pdf_bytes[:4] == b'%PDF'
+    assert pdf_bytes.count(b'/Type /Page\n') > 1
+
+    print(f"✅ Test 3 passed: canvas PDF generated ({len(pdf_bytes)} bytes)")
+
+
+def test_unknown_renderer_is_rejected():
+    """
+    Test 4: Nepoznat renderer baca ValueError
+    """
+    with pytest.raises(ValueError):
+        generate_invoice_pdf(SAMPLE_ORDER, renderer='html')
+
+
+def test_compact_renderer_draws_long_invoice_static_layer_as_forms():
+    """
+    Test 5: Compact renderer u dugim fakturama definiše zaglavlje tabele i
+    footer jednom po dokumentu (form XObject), a kratke crta bez formi;
+    stari naziv 'template' daje isti PDF
+    """
+    import pdf_generator
+
+    items = [{**SAMPLE_ORDER['items'][0], 'product_code': f'PROD-{i:03d}'} for i in range(200)]
+    long_invoice = generate_invoice_pdf({**SAMPLE_ORDER, 'items': items}, renderer='compact')
+    short_invoice = generate_invoice_pdf(SAMPLE_ORDER, renderer='compact')
+
+    assert pdf_generator._compact_page_count(
+        list(pdf_generator._item_rows(items))
+    ) >= pdf_generator.COMPACT_FORM_MIN_PAGES
+    assert long_invoice.count(b'/Subtype /Form') == 2
+    # Svaka strana referencira isti footer XObject
+    assert long_invoice.count(b'/Type /Page\n') == long_invoice.count(b'/FormXob.InvoiceFooter ')
+    assert short_invoice[:4] == b'%PDF' and b'/Subtype /Form' not in short_invoice
+    assert len(generate_invoice_pdf(SAMPLE_ORDER, renderer='template')) == len(short_invoice)
+
+
+@patch('worker.render_invoice_pdf')
+@patch('worker.get_order')
+@patch('worker.find_existing_invoice')
+def test_redelivered_message_is_skipped(mock_find, mock_get_order, mock_render):
+    """
+    Test 6: Ponovljena poruka za već fakturisanu narudžbinu se ne renderuje ponovo
+    """
+    mock_find.return_value = MagicMock()
+    mock_get_order.return_value = {'status': 'completed', 'pdf_url': 'http://blob/ORD.pdf'}
+
+    pdf_url = worker.process_message(SAMPLE_ORDER)
+
+    assert pdf_url is None
+    mock_find.assert_called_once_with(
+        SAMPLE_ORDER['order_number'], worker.invoice_content_hash(SAMPLE_ORDER)
+    )
+    mock_render.assert_not_called()
+
+
+@patch('worker.generate_pdf_url', return_value='http://blob/ORD.pdf?sas')
+@patch('worker.render_invoice_pdf')
+@patch('worker.get_order', return_value={'status': 'pending', 'pdf_url': None})
+@patch('worker.find_existing_invoice')
+def test_uploaded_pdf_is_reused_for_pending_order(mock_find, mock_get_order, mock_render,
+                                                  mock_url):
+    """
+    Test 7: Ako je PDF već uploadovan, a narudžbina nije završena, samo se ažurira narudžbina
+    """
+    mock_find.return_value = MagicMock()
+
+    pdf_url = worker.process_message(SAMPLE_ORDER)
+
+    mock_render.assert_not_called()
+    assert pdf_url == 'http://blob/ORD.pdf?sas'
+
+
+def test_message_lease_renews_visibility_and_deletes_with_latest_receipt():
+    """
+    Test 8: Heartbeat produžava vidljivost poruke; brisanje koristi poslednji pop receipt
+    """
+    queue_client = MagicMock()
+    queue_client.update_message.side_effect = [
+        MagicMock(pop_receipt=f'receipt-{i}') for i in range(1, 100)
+    ]
+    message = MagicMock(id='msg-1', pop_receipt='receipt-0')
+
+    lease = MessageLease(queue_client, message, visibility_timeout=30, renew_interval=0.01)
+    with lease:
+        time.sleep(0.1)
+    renewals = queue_client.update_message.call_count
+
+    assert renewals >= 2
+    queue_client.update_message.assert_called_with(
+        'msg-1', pop_receipt=f'receipt-{renewals - 1}', visibility_timeout=30
+    )
+
+    lease.complete()
+    queue_client.delete_message.assert_called_once_with('msg-1', f'receipt-{renewals}')
+
+
+def _queue_message(content, dequeue_count):
+    return MagicMock(id='msg-1', pop_receipt='receipt-0', content=content,
+                     dequeue_count=dequeue_count, inserted_on=datetime.now(timezone.utc))
+
+
+def _queue_client(queue_name='invoice-queue'):
+    return MagicMock(queue_name=queue_name)
+
+
+@patch('worker.process_message', side_effect=RuntimeError('blob unavailable'))
+def test_failing_message_is_moved_to_poison_queue_after_max_attempts(mock_process):
+    """
+    Test 9: Poruka koja ne uspe MAX_DEQUEUE_COUNT puta završava u poison redu
+    """
+    queue_client, poison_client = _queue_client(), MagicMock()
+
+    retried = worker.handle_message(
+        queue_client, poison_client, MagicMock(), _queue_message(json.dumps(SAMPLE_ORDER), 1)
+    )
+    assert retried is False
+    poison_client.send_message.assert_not_called()
+    queue_client.delete_message.assert_not_called()
+
+    worker.handle_message(
+        queue_client, poison_client, MagicMock(),
+        _queue_message(json.dumps(SAMPLE_ORDER), worker.Config.MAX_DEQUEUE_COUNT)
+    )
+    poisoned = json.loads(poison_client.send_message.call_args[0][0])
+    assert poisoned['reason'] == 'RuntimeError: blob unavailable'
+    assert json.loads(poisoned['content']) == SAMPLE_ORDER
+    queue_client.delete_message.assert_called_once_with('msg-1', 'receipt-0')
+
+
+@patch('worker.process_message')
+def test_invalid_payload_is_poisoned_immediately(mock_process):
+    """
+    Test 10: Poruka koja nije validan JSON ide direktno u poison red
+    """
+    queue_client, poison_client = _queue_client(), MagicMock()
+
+    worker.handle_message(queue_client, poison_client, MagicMock(), _queue_message('not-json', 1))
+
+    mock_process.assert_not_called()
+    poison_client.send_message.assert_called_once()
+    queue_client.delete_message.assert_called_once()
+
+
+def test_blob_storage_is_shared_and_builds_sas_without_network():
+    """
+    Test 11: Blob klijent se kreira jednom; SAS URL koristi već parsirane kredencijale
+    """
+    worker._blob_storage = None
+    storage = worker.get_blob_storage()
+
+    assert isinstance(storage, InvoiceBlobStorage)
+    assert worker.get_blob_storage() is storage
+    assert storage.account_name == 'devstoreaccount1'
+
+    blob_client = storage.get_blob_client('ORD-20260101-TEST01.pdf')
+    pdf_url = storage.generate_read_url(blob_client)
+    assert pdf_url.startswith(blob_client.url + '?')
+    assert 'sig=' in pdf_url and 'sp=r' in pdf_url
+
+
+def test_render_invoice_pdf_streams_into_file():
+    """
+    Test 12: PDF se renderuje direktno u fajl-like objekat i vraća veličinu
+    """
+    with tempfile.TemporaryFile() as pdf_file:
+        size = render_invoice_pdf(SAMPLE_ORDER, pdf_file, renderer='canvas')
+        pdf_file.seek(0)
+        content = pdf_file.read()
+
+    assert size == len(content) > 1024
+    assert content[:4] == b'%PDF'
+
+
+@patch('worker.process_message', side_effect=lambda data: f"http://blob/{data['order_number']}.pdf")
+def test_invoice_callbacks_are_batched_and_delete_after_flush(mock_process):
+    """
+    Test 13: Ažuriranja narudžbina idu u jednom batch pozivu; poruka se briše tek
+    kada je njena narudžbina ažurirana, a neuspele ostaju u redu za ponovni pokušaj
+    """
+    queue_client, poison_client, order_client = _queue_client(), MagicMock(), MagicMock()
+    order_client.update_invoices.return_value = {1, 2}
+    batcher = InvoiceCallbackBatcher(order_client, max_batch_size=3, flush_interval=60)
+
+    for order_id in (1, 2):
+        message = _queue_message(json.dumps({**SAMPLE_ORDER, 'order_id': order_id,
+                                             'order_number': f'ORD-{order_id}'}), 1)
+        message.id = f'msg-{order_id}'
+        worker.handle_message(queue_client, poison_client, batcher, message)
+
+    order_client.update_invoices.assert_not_called()
+    queue_client.delete_message.assert_not_called()
+
+    message = _queue_message(json.dumps({**SAMPLE_ORDER, 'order_id': 3,
+                                         'order_number': 'ORD-3'}), 1)
+    message.id = 'msg-3'
+    worker.handle_message(queue_client, poison_client, batcher, message)
+
+    order_client.update_invoices.assert_called_once_with([
+        {'order_id': i, 'pdf_url': f'http://blob/ORD-{i}.pdf', 'status': 'completed'}
+        for i in (1, 2, 3)
+    ])
+    assert len(batcher) == 0
+    deleted = sorted(call.args[0] for call in queue_client.delete_message.call_args_list)
+    assert deleted == ['msg-1', 'msg-2']
+
+
+def test_regenerate_builds_messages_and_resumes_from_checkpoint(tmp_path):
+    """
+    Test 14: Regeneracija pravi poruke istog oblika kao red i nastavlja od checkpoint-a
+    """
+    orders = [{'id': 7, 'order_number': 'ORD-7', 'customer_id': 'CUST-001',
+               'customer_name': 'Marko Markovic', 'total_price': Decimal('199.98'),
+               'created_at': datetime(2026, 1, 5, 10, 0)}]
+    items = [{'order_id': 7, 'product_code': 'PROD-002', 'product_name': 'Mouse',
+              'quantity': 2, 'unit_price': Decimal('99.99'), 'total_price': Decimal('199.98')}]
+
+    [message] = regenerate.build_invoice_messages(orders, items)
+    assert message['order_id'] == 7
+    assert message['items'][0]['unit_price'] == 99.99
+    assert message['created_at'] == '2026-01-05T10:00:00'
+    assert regenerate.render_invoice(message, 'canvas')[:4] == b'%PDF'
+
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    date_from, date_to = date(2026, 1, 1), date(2026, 2, 1)
+    assert regenerate.load_checkpoint(checkpoint, date_from, date_to) == (0, 0)
+
+    regenerate.save_checkpoint(checkpoint, date_from, date_to, last_id=7, processed=1)
+    assert regenerate.load_checkpoint(checkpoint, date_from, date_to) == (7, 1)
+    with pytest.raises(ValueError):
+        regenerate.load_checkpoint(checkpoint, date_from, date(2026, 3, 1))
+
+    # pdf_url ide kroz Order Service (NOTIFY), status narudžbine se ne menja
+    order_client = MagicMock()
+    order_client.update_invoices.return_value = {7}
+    assert regenerate.update_pdf_urls(order_client, [(7, 'http://blob/ORD-7.pdf')]) == 1
+    order_client.update_invoices.assert_called_once_with(
+        [{'order_id': 7, 'pdf_url': 'http://blob/ORD-7.pdf', 'status': None}]
+    )
+
+    # CLI i procesi iz pool-a ne uvoze worker (logging, metrike, klijenti)
+    probe = subprocess.run(
+        [sys.executable, '-c', "import sys, regenerate; print('worker' in sys.modules)"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True, check=True
+    )
+    assert probe.stdout.strip() == 'False'
+
+
+@patch('worker.get_payload_storage')
+@patch('worker.fetch_payload')
+@patch('worker.process_message', return_value=None)
+def test_compact_and_claim_check_messages_are_decoded(mock_process, mock_fetch, mock_payloads):
+    """
+    Test 15: Worker čita binarne, claim-check i stare JSON poruke; payload
+    blob se briše kada poruka napusti red (obrađena ili u poison redu)
+    """
+    queue_client, poison_client = _queue_client(), MagicMock()
+    mock_fetch.return_value = encode_payload(SAMPLE_ORDER)
+
+    inline = encode_message(SAMPLE_ORDER)
+    assert len(inline) < len(json.dumps(SAMPLE_ORDER))
+
+    with patch('message_codec.MAX_INLINE_MESSAGE_BYTES', 0):
+        claim_check = encode_message(SAMPLE_ORDER, offload=lambda payload: 'payloads/ORD.bin')
+
+    for content in (inline, claim_check, json.dumps(SAMPLE_ORDER)):
+        worker.handle_message(queue_client, poison_client, MagicMock(), _queue_message(content, 1))
+
+    assert [call.args[0] for call in mock_process.call_args_list] == [SAMPLE_ORDER] * 3
+    mock_fetch.assert_called_once_with('payloads/ORD.bin')
+    poison_client.send_message.assert_not_called()
+    mock_payloads.return_value.delete.assert_called_once_with('payloads/ORD.bin')
+
+    mock_payloads.reset_mock()
+    poisoned = _queue_message(claim_check, worker.Config.MAX_DEQUEUE_COUNT + 1)
+    worker.handle_message(queue_client, poison_client, MagicMock(), poisoned)
+    poison_client.send_message.assert_called_once()
+    mock_payloads.return_value.delete.assert_called_once_with('payloads/ORD.bin')
+    assert claim_check_reference(inline) is None
+
+    with pytest.raises(MessageDecodeError):
+        worker.decode_message('AAAA')
+
+
+@patch('worker.get_order_client')
+@patch('worker.process_message', return_value=None)
+def test_thin_messages_are_hydrated_with_one_batch_call(mock_process, mock_get_client):
+    """
+    Test 16: "Thin" poruke iz jedne stranice se dopunjuju jednim pozivom Order Service-u;
+    narudžbina koja nije pronađena se ne obrađuje i poruka ostaje u redu, a pri
+    nedostupnom Order Service-u se thin poruke vraćaju u red sa backoff-om
+    """
+    queue_client, poison_client = _queue_client(), MagicMock()
+    order = {**SAMPLE_ORDER, 'id': 1, 'status': 'pending', 'pdf_url': None}
+    del order['order_id']
+    mock_get_client.return_value.get_orders.return_value = {1: order}
+
+    page = [
+        _queue_message(encode_message({'order_id': 1, 'order_number': 'ORD-20260101-TEST01'}), 1),
+        _queue_message(encode_message({'order_id': 2, 'order_number': 'ORD-2'}), 1),
+        _queue_message(encode_message(SAMPLE_ORDER), 1),
+    ]
+    processed = worker.handle_messages(queue_client, poison_client, MagicMock(), page)
+
+    assert processed == 2
+    mock_get_client.return_value.get_orders.assert_called_once_with([1, 2])
+    assert [call.args[0] for call in mock_process.call_args_list] == [SAMPLE_ORDER] * 2
+    poison_client.send_message.assert_not_called()
+    assert queue_client.delete_message.call_count == 2
+
+    # Ispad Order Service-a: ni poslednji pokušaj ne završava u poison redu
+    queue_client, mock_process.call_args_list[:] = _queue_client(), []
+    mock_get_client.return_value.get_orders.side_effect = ConnectionError('order-service down')
+    max_attempts = worker.Config.MAX_DEQUEUE_COUNT
+    page = [
+        _queue_message(encode_message({'order_id': 1, 'order_number': 'ORD-1'}), 2),
+        _queue_message(encode_message({'order_id': 2, 'order_number': 'ORD-2'}), max_attempts),
+        _queue_message(encode_message(SAMPLE_ORDER), 1),
+    ]
+    processed = worker.handle_messages(queue_client, poison_client, MagicMock(), page)
+
+    assert processed == 1
+    assert [call.args[0] for call in mock_process.call_args_list] == [SAMPLE_ORDER]
+    poison_client.send_message.assert_not_called()
+    backoffs = [call.kwargs['visibility_timeout'] for call in queue_client.update_message.call_args_list]
+    assert backoffs == [worker.hydration_backoff(2), worker.hydration_backoff(max_attempts)]
+    assert worker.hydration_backoff(2) == 2 * worker.Config.VISIBILITY_TIMEOUT_SECONDS
+    assert worker.hydration_backoff(100) == worker.Config.HYDRATION_RETRY_MAX_SECONDS
+
+
+class FakeQueue:
+    """Stand-in za Azure red: broj poruka i vreme ubacivanja najstarije."""
+
+    queue_name = 'invoice-queue'
+
+    def __init__(self, inserted):
+        self.inserted = inserted
+
+    def get_queue_properties(self):
+        return MagicMock(approximate_message_count=len(self.inserted))
+
+    def peek_messages(self, max_messages=1):
+        return [MagicMock(inserted_on=inserted) for inserted in self.inserted[:max_messages]]
+
+
+def test_metrics_endpoint_reports_backlog_and_rate():
+    """
+    Test 17: /metrics prikazuje dužinu reda, starost najstarije poruke i brzinu obrade
+    """
+    now = datetime.now(timezone.utc)
+    metrics = WorkerMetrics(rate_window_seconds=10)
+    QueueMonitor([FakeQueue([now - timedelta(seconds=120), now])], metrics, interval=1).poll()
+    for _ in range(5):
+        metrics.record('invoice-queue', 'success', latency=3)
+    metrics.record('invoice-queue', 'failed')
+
+    server = MetricsServer(0, metrics, host='127.0.0.1')
+    server.start()
+    try:
+        url = f'http://127.0.0.1:{server.port}'
+        body = urllib.request.urlopen(f'{url}/metrics').read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'{url}/missing')
+    finally:
+        server.stop()
+
+    assert 'invoice_queue_length{queue="invoice-queue"} 2.0' in body
+    age = float(body.split('invoice_queue_oldest_message_age_seconds{queue="invoice-queue"} ')[1].split()[0])
+    assert 119 <= age < 130
+    assert 'invoice_backlog 2.0' in body
+    assert 'invoice_messages_total{queue="invoice-queue",result="success"} 5.0' in body
+    assert 'invoice_latency_seconds_count{queue="invoice-queue"} 5.0' in body
+    assert 'invoice_processing_rate 0.5' in body
+
+
+def test_shutdown_releases_unstarted_messages_and_drains_callbacks():
+    """
+    Test 18: Posle SIGTERM-a tekuća faktura se završava, ostatak stranice se vraća
+    u red sa vidljivošću 0, a preostala ažuriranja se šalju pre izlaska
+    """
+    queue_client, poison_client, order_client = _queue_client(), MagicMock(), MagicMock()
+    order_client.update_invoices.return_value = {1}
+    batcher = InvoiceCallbackBatcher(order_client, max_batch_size=10, flush_interval=60)
+
+    def render_then_sigterm(data):
+        worker._shutdown.set()
+        return f"http://blob/{data['order_number']}.pdf"
+
+    page = []
+    for order_id in (1, 2):
+        message = _queue_message(encode_message({**SAMPLE_ORDER, 'order_id': order_id}), 1)
+        message.id = f'msg-{order_id}'
+        page.append(message)
+
+    try:
+        with patch('worker.process_message', side_effect=render_then_sigterm):
+            processed = worker.handle_messages(queue_client, poison_client, batcher, page)
+
+        assert processed == 1
+        queue_client.update_message.assert_called_once_with(
+            'msg-2', pop_receipt='receipt-0', visibility_timeout=0
+        )
+        queue_client.delete_message.assert_not_called()
+
+        worker.drain(batcher)
+        order_client.update_invoices.assert_called_once()
+        queue_client.delete_message.assert_called_once_with('msg-1', 'receipt-0')
+        assert not worker._in_flight
+    finally:
+        worker._shutdown.clear()
+        worker._in_flight.clear()
+
+
+def test_lane_scheduler_is_weighted_and_work_conserving():
+    """
+    Test 19: Realtime lane dobija 4 od 5 krugova, a prazan lane ustupa red drugom
+    """
+    weights = parse_lane_weights('realtime:4, bulk:1')
+    assert weights == {'realtime': 4, 'bulk': 1}
+
+    realtime = Lane('realtime', _queue_client('invoice-queue'), weights['realtime'])
+    bulk = Lane('bulk', _queue_client('invoice-queue-bulk'), weights['bulk'])
+    scheduler = LaneScheduler([realtime, bulk])
+
+    rounds = [scheduler.order() for _ in range(10)]
+    first = [order[0].name for order in rounds]
+    assert first.count('realtime') == 8 and first.count('bulk') == 2
+    assert 'bulk' not in first[:2] and first[:5].count('bulk') == 1
+    assert all(len(order) == 2 and order[0] is not order[1] for order in rounds)
+
+    bulk.queue_client.receive_messages.return_value = iter([_queue_message('{}', 1)])
+    assert len(bulk.receive(16, 30)) == 1
+    bulk.queue_client.receive_messages.assert_called_once_with(
+        messages_per_page=16, max_messages=16, visibility_timeout=30
+    )
+    with pytest.raises(ValueError):
+        parse_lane_weights('realtime:0')
+
+
+@patch('worker.upload_pdf_to_blob', return_value='http://blob/ORD.pdf?sas')
+@patch('worker.find_existing_invoice', return_value=None)
+def test_pipeline_stages_are_timed(mock_find, mock_upload):
+    """
+    Test 20: Svaka faza obrade (čekanje u redu, render, upload, callback, ukupno) ima histogram
+    """
+    queue_client, order_client = _queue_client(), MagicMock()
+    order_client.update_invoices.return_value = {1}
+    stage_metrics = WorkerMetrics()
+    batcher = InvoiceCallbackBatcher(
+        order_client, max_batch_size=1,
+        on_flush=lambda seconds, batch_size: stage_metrics.observe_stage('callback', seconds)
+    )
+    created_at = (datetime.utcnow() - timedelta(seconds=90)).isoformat()
+    message = _queue_message(encode_message({**SAMPLE_ORDER, 'created_at': created_at}), 1)
+
+    with patch('worker.metrics', stage_metrics):
+        assert worker.handle_messages(queue_client, MagicMock(), batcher, [message]) == 1
+
+    body = stage_metrics.render().decode()
+    for stage in ('queue_wait', 'render', 'upload', 'callback', 'end_to_end'):
+        assert f'invoice_stage_seconds_count{{stage="{stage}"}} 1.0' in body
+    assert 'invoice_pdf_size_bytes_count 1.0' in body
+    assert 'invoice_stage_seconds_bucket{le="60.0",stage="queue_wait"} 0.0' in body
+    assert 'invoice_stage_seconds_bucket{le="300.0",stage="end_to_end"} 1.0' in body
+    assert worker.seconds_since('not-a-date') is None
+
+
+@patch('worker.upload_pdf_to_blob', return_value='https://blob/ORD-20260101-TEST01.pdf')
+@patch('worker.find_existing_invoice', return_value=None)
+def test_process_message_continues_trace_from_message(mock_find, mock_upload, tmp_path):
+    """
+    Test 21: process_message() nastavlja trace iz traceparent-a poruke, a render
+    i upload su njegovi podređeni span-ovi
+    """
+    trace_id, producer_span_id = 'c' * 32, 'd' * 16
+    export_file = tmp_path / 'traces.jsonl'
+    tracing.configure('invoice-worker', file_path=str(export_file))
+    try:
+        worker.process_message({**SAMPLE_ORDER, 'traceparent': f'00-{trace_id}-{producer_span_id}-01'})
+        tracing.flush()
+    finally:
+        tracing.configure('invoice-worker')
+
+    request = json.loads(export_file.read_text())
+    resource = request['resourceSpans'][0]
+    assert resource['resource']['attributes'][0]['value']['stringValue'] == 'invoice-worker'
+    spans = {span['name']: span for span in resource['scopeSpans'][0]['spans']}
+    assert set(spans) == {'invoice.process', 'invoice.render', 'invoice.upload'}
+    assert all(span['traceId'] == trace_id for span in spans.values())
+    assert spans['invoice.process']['parentSpanId'] == producer_span_id
+    assert spans['invoice.process']['kind'] == tracing.CONSUMER
+    assert spans['invoice.render']['parentSpanId'] == spans['invoice.process']['spanId']
+    assert int(spans['invoice.render']['endTimeUnixNano']) >= int(spans['invoice.render']['startTimeUnixNano'])
+
+    # Poruka bez traceparent-a (stari producer) počinje novi trace
+    assert tracing.parse_traceparent(None) is None
+    assert tracing.parse_traceparent('00-xyz-123-01') is None
+
+
+def test_profile_endpoint_requires_token_and_returns_collapsed_stacks():
+    """
+    Test 22: /admin/profile na metrics portu traži token i vraća collapsed
+    stekove thread-ova koji troše CPU
+    """
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    busy = threading.Thread(target=busy_loop, daemon=True)
+    busy.start()
+
+    server = MetricsServer(0, WorkerMetrics(), host='127.0.0.1')
+    server.add_route('/admin/profile', profiler.http_handler('s3cret', max_seconds=2))
+    server.start()
+    try:
+        url = f'http://127.0.0.1:{server.port}/admin/profile'
+        with pytest.raises(urllib.error.HTTPError) as unauthorized:
+            urllib.request.urlopen(urllib.request.Request(url, headers={'Authorization': 'Bearer wrong'}))
+        with pytest.raises(urllib.error.HTTPError) as too_long:
+            urllib.request.urlopen(urllib.request.Request(
+                f'{url}?seconds=10', headers={'Authorization': 'Bearer s3cret'}
+            ))
+        response = urllib.request.urlopen(urllib.request.Request(
+            f'{url}?seconds=0.3&interval_ms=5', headers={'Authorization': 'Bearer s3cret'}
+        ))
+        body = response.read().decode()
+    finally:
+        server.stop()
+        stop.set()
+
+    assert unauthorized.value.code == 401
+    assert unauthorized.value.headers['WWW-Authenticate'] == 'Bearer'
+    assert too_long.value.code == 400
+    assert response.headers['X-Profile-Pid'] == str(os.getpid())
+    assert int(response.headers['X-Profile-Samples']) > 10
+    stacks = dict(line.rsplit(' ', 1) for line in body.splitlines())
+    assert any(stack.split(';')[-1].startswith('busy_loop (test_worker.py:') for stack in stacks)
+    assert all(';' in stack and int(value) > 0 for stack, value in stacks.items())
+
+
+def test_compact_renderer_is_not_larger_than_canvas():
+    """
+    Test 23: Compact renderer pravi PDF koji nije veći od canvas renderera,
+    za fakture od jedne do više strana
+    """
+    for item_count in (1, 2, 20, 50, 200):
+        items = [
+            {**SAMPLE_ORDER['items'][0], 'product_code': f'PROD-{i:03d}', 'quantity': i}
+            for i in range(item_count)
+        ]
+        order = {**SAMPLE_ORDER, 'items': items}
+        compact_size = len(generate_invoice_pdf(order, renderer='compact'))
+        canvas_size = len(generate_invoice_pdf(order, renderer='canvas'))
+        assert compact_size <= canvas_size, (item_count, compact_size, canvas_size)
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
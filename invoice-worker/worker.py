@@ -1,12 +1,24 @@
+import os
 import json
 import time
+import signal
+import threading
+import tempfile
 import logging
-import requests
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.queue import QueueClient
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
 from config import Config
-from pdf_generator import generate_invoice_pdf
+from blob_storage import InvoiceBlobStorage
+from order_client import OrderServiceClient, InvoiceCallbackBatcher
+from pdf_generator import render_invoice_pdf
+from invoice_hash import invoice_content_hash
+from message_lease import MessageLease
+from message_codec import decode_message, claim_check_reference
+from metrics import WorkerMetrics, QueueMonitor, MetricsServer
+from lanes import Lane, LaneScheduler, parse_lane_weights
+import tracing
+import profiler
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,153 +26,509 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+metrics = WorkerMetrics()
 
-def parse_connection_string(conn_str):
-    parts = {}
-    for segment in conn_str.split(';'):
-        if '=' in segment:
-            key, value = segment.split('=', 1)
-            parts[key.strip()] = value.strip()
-    return parts
+_blob_storage = None
+_payload_storage = None
+_order_client = None
 
+# Postavlja se na SIGTERM/SIGINT; leases poruka koje su trenutno u obradi
+_shutdown = threading.Event()
+_in_flight = set()
 
-def upload_pdf_to_blob(pdf_bytes, order_number):
-    blob_name = f"{order_number}.pdf"
 
-    blob_service = BlobServiceClient.from_connection_string(
-        Config.AZURE_STORAGE_CONNECTION_STRING
-    )
+def get_blob_storage():
+    global _blob_storage
+    if _blob_storage is None:
+        _blob_storage = InvoiceBlobStorage(
+            Config.AZURE_STORAGE_CONNECTION_STRING,
+            Config.AZURE_BLOB_CONTAINER,
+            pool_size=Config.BLOB_CONNECTION_POOL_SIZE,
+            max_single_put_size=Config.BLOB_MAX_SINGLE_PUT_SIZE,
+            max_block_size=Config.BLOB_MAX_BLOCK_SIZE,
+            max_concurrency=Config.BLOB_UPLOAD_MAX_CONCURRENCY
+        )
+    return _blob_storage
+
+
+def get_payload_storage():
+    global _payload_storage
+    if _payload_storage is None:
+        _payload_storage = InvoiceBlobStorage(
+            Config.AZURE_STORAGE_CONNECTION_STRING,
+            Config.AZURE_PAYLOAD_CONTAINER,
+            pool_size=Config.BLOB_CONNECTION_POOL_SIZE
+        )
+    return _payload_storage
 
-    container_client = blob_service.get_container_client(Config.AZURE_BLOB_CONTAINER)
+
+def fetch_payload(blob_name):
+    """Učitava claim-check payload sačuvan umesto prevelike poruke."""
+    return get_payload_storage().download(blob_name)
+
+
+def delete_payload(message):
+    """
+    Briše claim-check payload poruke koja je obrisana iz reda. Greška se samo
+    loguje: poruka je već završena, a blob tada ostaje kao siroče.
+    """
     try:
-        container_client.create_container()
-        logger.info(f"Container '{Config.AZURE_BLOB_CONTAINER}' created")
-    except Exception:
-        pass
+        blob_name = claim_check_reference(message.content)
+        if blob_name and get_payload_storage().delete(blob_name):
+            logger.info(f"Invoice payload blob {blob_name} deleted")
+    except Exception as e:
+        logger.warning(f"Could not delete payload of message {message.id}: {e}")
 
-    blob_client = blob_service.get_blob_client(
-        container=Config.AZURE_BLOB_CONTAINER,
-        blob=blob_name
-    )
-    blob_client.upload_blob(pdf_bytes, overwrite=True)
-    logger.info(f"PDF uploaded: {blob_client.url}")
 
-    conn_parts = parse_connection_string(Config.AZURE_STORAGE_CONNECTION_STRING)
-    account_name = conn_parts.get('AccountName', 'devstoreaccount1')
-    account_key  = conn_parts.get('AccountKey', '')
-
-    sas_token = generate_blob_sas(
-        account_name=account_name,
-        container_name=Config.AZURE_BLOB_CONTAINER,
-        blob_name=blob_name,
-        account_key=account_key,
-        permission=BlobSasPermissions(read=True),
-        expiry=datetime.now(timezone.utc) + timedelta(days=365),
-    )
+def find_existing_invoice(order_number, content_hash):
+    """Vraća blob klijent ako je faktura sa istim sadržajem već uploadovana."""
+    blob_client = get_blob_storage().get_blob_client(f"{order_number}.pdf")
+    try:
+        properties = blob_client.get_blob_properties()
+    except ResourceNotFoundError:
+        return None
 
-    pdf_url = f"{blob_client.url}?{sas_token}"
+    if properties.metadata.get('content_hash') != content_hash:
+        return None
+    return blob_client
+
+
+def generate_pdf_url(blob_client):
+    pdf_url = get_blob_storage().generate_read_url(blob_client)
     logger.info(f"SAS URL generated successfully")
     return pdf_url
 
 
-def update_order_invoice(order_id, pdf_url):
+def upload_pdf_to_blob(pdf_data, order_number, content_hash=None, length=None):
+    metadata = {'content_hash': content_hash} if content_hash else None
+    blob_client = get_blob_storage().upload(
+        f"{order_number}.pdf", pdf_data, metadata, length=length
+    )
+    logger.info(f"PDF uploaded: {blob_client.url}")
 
-    try:
-        response = requests.post(
-            f"{Config.ORDER_SERVICE_URL}/orders/{order_id}/invoice",
-            json={
-                'pdf_url': pdf_url,
-                'status': 'completed'
-            },
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            logger.info(f"Order {order_id} invoice updated successfully via API")
-            return True
-        else:
-            logger.error(f"Failed to update order {order_id}: {response.text}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Error calling Order Service API: {e}")
-        raise
+    return generate_pdf_url(blob_client)
+
+
+def get_order_client():
+    global _order_client
+    if _order_client is None:
+        _order_client = OrderServiceClient(Config.ORDER_SERVICE_URL)
+    return _order_client
+
+
+def get_order(order_id):
+    return get_order_client().get_order(order_id)
 
 
 def process_message(message_data):
+    """
+    Renderuje i upload-uje fakturu. Vraća pdf_url koji treba upisati u
+    narudžbinu, ili None ako je narudžbina već fakturisana. Span obrade
+    nastavlja trace iz create_order() preko traceparent-a iz poruke.
+    """
+    with tracing.span(
+        'invoice.process',
+        parent=tracing.parse_traceparent(message_data.get('traceparent')),
+        kind=tracing.CONSUMER,
+        attributes={
+            'order.id': message_data['order_id'],
+            'order.number': message_data['order_number'],
+            'messaging.queue_wait_seconds': seconds_since(message_data.get('created_at'))
+        }
+    ) as span:
+        pdf_url = _process_message(message_data)
+        span.set_attribute('invoice.skipped', pdf_url is None)
+        return pdf_url
+
+
+def _process_message(message_data):
     order_id     = message_data['order_id']
     order_number = message_data['order_number']
 
     logger.info(f"Processing order {order_number} (ID: {order_id})")
 
-    logger.info(f"Generating PDF for order {order_number}...")
-    pdf_bytes = generate_invoice_pdf(message_data)
-
-    logger.info(f"Uploading PDF to blob storage...")
-    pdf_url = upload_pdf_to_blob(pdf_bytes, order_number)
+    content_hash = invoice_content_hash(message_data)
+    existing_blob = find_existing_invoice(order_number, content_hash)
+    if existing_blob:
+        # Ponovljena isporuka poruke: PDF je već uploadovan
+        order = get_order(order_id)
+        if order and order.get('status') == 'completed' and order.get('pdf_url'):
+            logger.info(f"⏭️  Order {order_number} already invoiced, skipping")
+            return None
+
+        logger.info(f"PDF for order {order_number} already uploaded, skipping render")
+        return generate_pdf_url(existing_blob)
+
+    # ReportLab ceo PDF pravi u memoriji i upisuje ga jednim write()-om; fajl
+    # na disku ga ne kopira još jednom, a posle save() u memoriji ne ostaje
+    # ništa. Upload ga čita u blokovima od BLOB_MAX_BLOCK_SIZE.
+    with tempfile.TemporaryFile() as pdf_file:
+        logger.info(f"Generating PDF for order {order_number}...")
+        started = time.perf_counter()
+        with tracing.span('invoice.render') as span:
+            pdf_size = render_invoice_pdf(message_data, pdf_file)
+            span.set_attribute('invoice.pdf_size', pdf_size)
+        metrics.observe_stage('render', time.perf_counter() - started)
+        metrics.pdf_size.observe(pdf_size)
+        pdf_file.seek(0)
+
+        logger.info(f"Uploading PDF to blob storage...")
+        started = time.perf_counter()
+        with tracing.span('invoice.upload', kind=tracing.CLIENT):
+            pdf_url = upload_pdf_to_blob(pdf_file, order_number, content_hash, length=pdf_size)
+        metrics.observe_stage('upload', time.perf_counter() - started)
 
-    logger.info(f"Updating order invoice via API...")
-    update_order_invoice(order_id, pdf_url)
-
-    logger.info(f"✅ Order {order_number} processed successfully.")
     return pdf_url
 
 
 def ensure_queue_exists(queue_client):
     try:
         queue_client.create_queue()
-        logger.info(f"Queue '{Config.AZURE_QUEUE_NAME}' created")
+        logger.info(f"Queue '{queue_client.queue_name}' created")
     except Exception:
         pass
 
 
+def move_to_poison_queue(poison_client, lease, message, reason):
+    # Claim-check payload se briše i ovde; narudžbina ostaje u Order bazi,
+    # pa se faktura po potrebi pravi ponovo (regenerate.py)
+    poison_client.send_message(json.dumps({
+        'queue': lease.queue_client.queue_name,
+        'message_id': message.id,
+        'dequeue_count': message.dequeue_count,
+        'reason': reason,
+        'failed_at': datetime.now(timezone.utc).isoformat(),
+        'content': message.content
+    }))
+    lease.complete()
+    delete_payload(message)
+    metrics.record(lease.queue_client.queue_name, 'poisoned')
+    logger.warning(f"☠️  Message {message.id} moved to '{Config.AZURE_POISON_QUEUE_NAME}': {reason}")
+
+
+def message_age(message):
+    """Sekunde od ubacivanja poruke u red."""
+    return (datetime.now(timezone.utc) - message.inserted_on).total_seconds()
+
+
+def seconds_since(timestamp):
+    """Sekunde od ISO 8601 vremena iz poruke (bez zone = UTC); None ako ga nema."""
+    if not timestamp:
+        return None
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - moment).total_seconds()
+
+
+def complete_message(lease, message, order_number, created_at=None):
+    lease.complete()
+    delete_payload(message)
+    metrics.record(lease.queue_client.queue_name, 'success', latency=message_age(message))
+    end_to_end = seconds_since(created_at)
+    if end_to_end is not None:
+        metrics.observe_stage('end_to_end', end_to_end)
+    logger.info(f"✅ Order {order_number} processed successfully, message deleted")
+
+
+def is_thin_message(message_data):
+    return 'items' not in message_data
+
+
+def hydrate_messages(messages_data):
+    """
+    "Thin" poruke nose samo order_id; narudžbine za celu stranicu poruka se
+    učitavaju jednim pozivom. Poruke čije narudžbine ne postoje ostaju thin i
+    obrada ih tretira kao neuspeh; nedostupan Order Service je izuzetak.
+    """
+    thin_ids = [data['order_id'] for data in messages_data if is_thin_message(data)]
+    if not thin_ids:
+        return messages_data
+
+    orders = get_order_client().get_orders(thin_ids)
+    logger.info(f"Hydrated {len(orders)}/{len(thin_ids)} orders from Order Service")
+
+    hydrated = []
+    for data in messages_data:
+        order = orders.get(data['order_id']) if is_thin_message(data) else None
+        if order:
+            traceparent = data.get('traceparent')
+            data = {
+                'order_id': order['id'],
+                'order_number': order['order_number'],
+                'customer_id': order['customer_id'],
+                'customer_name': order['customer_name'],
+                'items': order['items'],
+                'total_price': order['total_price'],
+                'created_at': order['created_at']
+            }
+            if traceparent:
+                data['traceparent'] = traceparent
+        hydrated.append(data)
+    return hydrated
+
+
+def hydration_backoff(dequeue_count):
+    """Vidljivost thin poruke vraćene jer Order Service nije dostupan."""
+    delay = Config.VISIBILITY_TIMEOUT_SECONDS * 2 ** (max(dequeue_count, 1) - 1)
+    return min(delay, Config.HYDRATION_RETRY_MAX_SECONDS)
+
+
+def _callback_failed(lease):
+    # Poruka se ponovo obrađuje posle isteka vidljivosti; pri gašenju odmah
+    if _shutdown.is_set():
+        lease.release()
+    else:
+        lease.stop()
+
+
+def handle_message(queue_client, poison_client, callback_batcher, message):
+    return handle_messages(queue_client, poison_client, callback_batcher, [message]) > 0
+
+
+def handle_messages(queue_client, poison_client, callback_batcher, messages):
+    """
+    Obrađuje stranicu poruka i vraća broj uspešno obrađenih. Ažuriranje
+    narudžbine ide kroz callback_batcher; lease (i heartbeat) traje dok batch
+    ne bude poslat, pa se tek onda poruka briše iz reda.
+    """
+    _in_flight.difference_update([lease for lease in list(_in_flight) if not lease.active])
+
+    leased = []
+    for message in messages:
+        lease = MessageLease(
+            queue_client,
+            message,
+            visibility_timeout=Config.VISIBILITY_TIMEOUT_SECONDS,
+            renew_interval=Config.VISIBILITY_RENEW_INTERVAL_SECONDS
+        )
+        lease.start()
+        _in_flight.add(lease)
+        try:
+            message_data = _decode_leased_message(poison_client, lease, message)
+        except Exception as e:
+            logger.error(f"Failed to read message {message.id}: {e}")
+            message_data = None
+
+        if message_data is None:
+            lease.stop()
+            continue
+        leased.append((lease, message, message_data))
+
+    messages_data = [message_data for _, _, message_data in leased]
+    hydration_failed = False
+    try:
+        messages_data = hydrate_messages(messages_data)
+    except Exception as e:
+        logger.warning(f"Order Service unavailable, deferring thin messages: {e}")
+        hydration_failed = True
+
+    processed = 0
+    for (lease, message, _), message_data in zip(leased, messages_data):
+        if _shutdown.is_set():
+            # Gašenje: ostatak stranice se odmah vraća u red
+            lease.release()
+            continue
+        if hydration_failed and is_thin_message(message_data):
+            # Ispad Order Service-a nije neuspeh poruke: vraća se u red sa
+            # backoff-om, bez obrade, metrike 'failed' i poison reda
+            lease.release(hydration_backoff(message.dequeue_count))
+            metrics.record(lease.queue_client.queue_name, 'deferred')
+            continue
+        try:
+            if _process_leased_message(poison_client, callback_batcher, lease, message, message_data):
+                processed += 1
+        except Exception as e:
+            logger.error(f"Failed to finish message {message.id}: {e}")
+            lease.stop()
+    return processed
+
+
+def _decode_leased_message(poison_client, lease, message):
+    if message.dequeue_count > Config.MAX_DEQUEUE_COUNT:
+        move_to_poison_queue(
+            poison_client, lease, message,
+            f"Exceeded max dequeue count ({Config.MAX_DEQUEUE_COUNT})"
+        )
+        return None
+
+    try:
+        return decode_message(message.content, fetch=fetch_payload)
+    except ValueError as e:
+        move_to_poison_queue(poison_client, lease, message, f"Invalid message payload: {e}")
+        return None
+
+
+def _process_leased_message(poison_client, callback_batcher, lease, message, message_data):
+    order_number = message_data.get('order_number')
+    try:
+        logger.info(f"📨 Received message for order: {order_number} "
+                    f"(attempt {message.dequeue_count}/{Config.MAX_DEQUEUE_COUNT})")
+
+        if is_thin_message(message_data):
+            raise LookupError(f"Order {message_data['order_id']} could not be loaded")
+
+        queue_wait = seconds_since(message_data.get('created_at'))
+        if queue_wait is not None:
+            metrics.observe_stage('queue_wait', queue_wait)
+
+        pdf_url = process_message(message_data)
+
+    except Exception as e:
+        logger.error(f"Failed to process message: {e}")
+        metrics.record(lease.queue_client.queue_name, 'failed')
+        if message.dequeue_count >= Config.MAX_DEQUEUE_COUNT:
+            move_to_poison_queue(poison_client, lease, message, f"{type(e).__name__}: {e}")
+        else:
+            lease.stop()
+        return False
+
+    created_at = message_data.get('created_at')
+    if pdf_url is None:
+        complete_message(lease, message, order_number, created_at)
+        return True
+
+    callback_batcher.add(
+        message_data['order_id'],
+        pdf_url,
+        on_success=lambda: complete_message(lease, message, order_number, created_at),
+        on_failure=lambda: _callback_failed(lease)
+    )
+    return True
+
+
+def request_shutdown(signum=None, frame=None):
+    if _shutdown.is_set():
+        return
+    logger.info(f"Shutdown requested (signal {signum}), "
+                f"finishing in-flight work within {Config.SHUTDOWN_GRACE_SECONDS}s")
+    _shutdown.set()
+
+    watchdog = threading.Timer(Config.SHUTDOWN_GRACE_SECONDS, _force_exit)
+    watchdog.daemon = True
+    watchdog.start()
+
+
+def _force_exit():
+    logger.error("Shutdown grace period expired, releasing in-flight messages")
+    release_in_flight()
+    os._exit(1)
+
+
+def release_in_flight():
+    released = 0
+    for lease in list(_in_flight):
+        try:
+            if lease.release():
+                released += 1
+        except Exception as e:
+            logger.warning(f"Could not release message {lease.message_id}: {e}")
+    _in_flight.clear()
+    if released:
+        logger.info(f"Released {released} in-flight messages back to the queue")
+
+
+def drain(callback_batcher):
+    """Šalje preostala ažuriranja narudžbina, a nezavršene poruke vraća u red."""
+    callback_batcher.flush()
+    release_in_flight()
+    tracing.flush()
+
+
 def run_worker():
     logger.info("=" * 50)
     logger.info("Invoice Worker started")
-    logger.info(f"Queue:          {Config.AZURE_QUEUE_NAME}")
+    for lane, queue_name in Config.LANE_QUEUES.items():
+        logger.info(f"Queue:          {queue_name} ({lane})")
+    logger.info(f"Lane weights:   {Config.LANE_WEIGHTS}")
+    logger.info(f"Poison queue:   {Config.AZURE_POISON_QUEUE_NAME} "
+                f"(after {Config.MAX_DEQUEUE_COUNT} attempts)")
     logger.info(f"Blob container: {Config.AZURE_BLOB_CONTAINER}")
     logger.info(f"Order Service:  {Config.ORDER_SERVICE_URL}")
+    logger.info(f"Callbacks:      batches of {Config.CALLBACK_BATCH_SIZE}, "
+                f"flushed every {Config.CALLBACK_FLUSH_INTERVAL_SECONDS}s")
     logger.info(f"Poll interval:  {Config.POLL_INTERVAL_SECONDS}s")
+    logger.info(f"Metrics:        :{Config.METRICS_PORT}/metrics")
+    logger.info(f"Visibility:     {Config.VISIBILITY_TIMEOUT_SECONDS}s "
+                f"(renewed every {Config.VISIBILITY_RENEW_INTERVAL_SECONDS}s)")
     logger.info("=" * 50)
 
-    queue_client = QueueClient.from_connection_string(
+    tracing.configure(
+        'invoice-worker',
+        file_path=Config.TRACE_EXPORT_FILE,
+        collector_url=Config.TRACE_COLLECTOR_URL,
+        sample_ratio=Config.TRACE_SAMPLE_RATIO
+    )
+
+    weights = parse_lane_weights(Config.LANE_WEIGHTS)
+    lanes = []
+    for lane_name, queue_name in Config.LANE_QUEUES.items():
+        queue_client = QueueClient.from_connection_string(
+            Config.AZURE_STORAGE_CONNECTION_STRING,
+            queue_name
+        )
+        ensure_queue_exists(queue_client)
+        lanes.append(Lane(lane_name, queue_client, weights.get(lane_name, 1)))
+    scheduler = LaneScheduler(lanes)
+
+    poison_client = QueueClient.from_connection_string(
         Config.AZURE_STORAGE_CONNECTION_STRING,
-        Config.AZURE_QUEUE_NAME
+        Config.AZURE_POISON_QUEUE_NAME
     )
-    ensure_queue_exists(queue_client)
+    ensure_queue_exists(poison_client)
 
-    while True:
-        try:
-            messages = queue_client.receive_messages(
-                messages_per_page=1,
-                visibility_timeout=30
-            )
+    get_blob_storage().ensure_container()
 
-            processed = False
-            for message in messages:
-                try:
-                    message_data = json.loads(message.content)
-                    logger.info(f"📨 Received message for order: {message_data.get('order_number')}")
+    metrics_server = MetricsServer(Config.METRICS_PORT, metrics)
+    if Config.ADMIN_TOKEN:
+        metrics_server.add_route(
+            '/admin/profile', profiler.http_handler(Config.ADMIN_TOKEN, Config.PROFILE_MAX_SECONDS)
+        )
+    metrics_server.start()
+    QueueMonitor(
+        [lane.queue_client for lane in lanes], metrics, Config.QUEUE_METRICS_INTERVAL_SECONDS
+    ).start()
+
+    callback_batcher = InvoiceCallbackBatcher(
+        get_order_client(),
+        max_batch_size=Config.CALLBACK_BATCH_SIZE,
+        flush_interval=Config.CALLBACK_FLUSH_INTERVAL_SECONDS,
+        on_flush=lambda seconds, batch_size: metrics.observe_stage('callback', seconds)
+    )
 
-                    process_message(message_data)
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
 
-                    queue_client.delete_message(message)
-                    logger.info(f"🗑️  Message deleted from queue")
+    while not _shutdown.is_set():
+        try:
+            # Jedna stranica po krugu, iz lane-a koji je na redu po težini;
+            # ako je on prazan, ustupa mesto sledećem
+            processed = False
+            for lane in scheduler.order():
+                page = lane.receive(Config.RECEIVE_BATCH_SIZE, Config.VISIBILITY_TIMEOUT_SECONDS)
+                if page:
+                    handle_messages(lane.queue_client, poison_client, callback_batcher, page)
                     processed = True
+                    break
+            callback_batcher.flush_if_due()
 
-                except Exception as e:
-                    logger.error(f"Failed to process message: {e}")
+            if processed:
+                continue
 
-            if not processed:
-                logger.debug(f"No messages, waiting {Config.POLL_INTERVAL_SECONDS}s...")
+            # Svi redovi su prazni: nema razloga da preostala ažuriranja čekaju
+            callback_batcher.flush()
+            logger.debug(f"No messages, waiting {Config.POLL_INTERVAL_SECONDS}s...")
 
-        except KeyboardInterrupt:
-            logger.info("Worker stopped by user")
-            break
         except Exception as e:
             logger.error(f"Worker error: {e}")
 
-        time.sleep(Config.POLL_INTERVAL_SECONDS)
+        _shutdown.wait(Config.POLL_INTERVAL_SECONDS)
+
+    drain(callback_batcher)
+    logger.info("Worker stopped")
 
 
 if __name__ == '__main__':
@@ -38,11 +38,20 @@ echo "Deploying services..."
 kubectl apply -f k8s/catalog/deployment.yaml
 kubectl apply -f k8s/order/deployment.yaml
 kubectl apply -f k8s/frontend/deployment.yaml
+kubectl apply -f k8s/invoice-worker/deployment.yaml
+
+# Autoskaliranje worker-a po dužini reda (samo ako je KEDA instalirana)
+if kubectl get crd scaledobjects.keda.sh >/dev/null 2>&1; then
+    kubectl apply -f k8s/invoice-worker/scaledobject.yaml
+else
+    echo "KEDA not installed, invoice-worker runs with a fixed replica count"
+fi
 
 echo "Waiting for services to be ready..."
 kubectl rollout status deployment/catalog-service -n cloud-order-system --timeout=120s
 kubectl rollout status deployment/order-service   -n cloud-order-system --timeout=120s
 kubectl rollout status deployment/frontend        -n cloud-order-system --timeout=120s
+kubectl rollout status deployment/invoice-worker  -n cloud-order-system --timeout=120s
 
 # 7. Ingress
 echo "Applying Ingress..."
@@ -1,13 +1,21 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from flask_compress import Compress
+from psycopg2.extras import RealDictCursor, execute_values
+import json
+import time
 import logging
 import uuid
 from datetime import datetime
 from config import Config
+from db import ReadinessCheck, get_db_connection, pool
+from json_provider import init_json
+from metrics import init_metrics
+import tracing
+import profiler
 from catalog_client import CatalogClient
 from queue_client import QueueMessageClient
+from order_events import OrderEventBroadcaster, notify_order_changes
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,19 +25,38 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+init_json(app, Config.JSON_PROVIDER)
+app.config.update(
+    # Samo JSON odgovori; SSE stream (text/event-stream) se ne kompresuje,
+    # jer kompresor zadržava događaje dok ne skupi dovoljno podataka
+    COMPRESS_MIMETYPES=['application/json'],
+    COMPRESS_STREAMS=False,
+    COMPRESS_ALGORITHM=Config.COMPRESS_ALGORITHMS,
+    COMPRESS_MIN_SIZE=Config.COMPRESS_MIN_SIZE,
+    COMPRESS_LEVEL=Config.COMPRESS_GZIP_LEVEL,
+    COMPRESS_BR_LEVEL=Config.COMPRESS_BR_LEVEL,
+)
+Compress(app)
+init_metrics(app)
+tracing.configure(
+    'order-service',
+    file_path=Config.TRACE_EXPORT_FILE,
+    collector_url=Config.TRACE_COLLECTOR_URL,
+    sample_ratio=Config.TRACE_SAMPLE_RATIO
+)
+tracing.init_flask(app)
+profiler.init_flask(app, Config.ADMIN_TOKEN, Config.PROFILE_MAX_SECONDS)
+
+readiness = ReadinessCheck(pool, cache_seconds=Config.READINESS_CACHE_SECONDS)
 
 catalog_client = CatalogClient()
 queue_client = QueueMessageClient()
+order_events = OrderEventBroadcaster(
+    Config.get_db_params(),
+    max_pending=Config.SSE_MAX_PENDING_EVENTS
+)
 
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**Config.get_db_params())
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        raise
-
 
 def generate_order_number():
     date_part = datetime.utcnow().strftime('%Y%m%d')
@@ -53,6 +80,23 @@ def health():
             'error': str(e)
         }), 503
 
+
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness: proces odgovara na zahteve; ne dodiruje bazu ni druge servise."""
+    return jsonify({'status': 'alive', 'service': 'order-service'}), 200
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: baza preko konekcije iz pool-a, rezultat keširan nekoliko sekundi."""
+    ready, database = readiness.check()
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'service': 'order-service',
+        'database': database
+    }), 200 if ready else 503
+
 @app.route('/orders', methods=['GET'])
 def get_orders():
     try:
@@ -97,9 +141,168 @@ def get_orders():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/orders/events', methods=['GET'])
+def stream_order_events():
+    """
+    Server-sent events: 'order' događaj za svaku promenu statusa/pdf_url-a,
+    'resync' kada su događaji mogli biti propušteni (klijent tada ponovo
+    učitava listu). Svi klijenti u procesu dele jedan LISTEN.
+    """
+    subscription = order_events.subscribe()
+
+    def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscription.overflowed:
+                event = subscription.get(timeout=Config.SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    # Komentar drži vezu otvorenom kroz proxy-je i otkriva zatvorene klijente
+                    yield ': keep-alive\n\n'
+                    continue
+                event_type, data = event
+                yield f'event: {event_type}\ndata: {data}\n\n'
+        finally:
+            order_events.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # nginx (ingress i frontend) ne sme da baferuje stream
+        'X-Accel-Buffering': 'no'
+    })
+
+
+def fetch_order(order_id):
+    conn = get_db_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    cursor.execute("""
+        SELECT id, order_number, customer_id, customer_name,
+               status, total_price, pdf_url, created_at, updated_at
+        FROM orders
+        WHERE id = %s
+    """, (order_id,))
+    order = cursor.fetchone()
+
+    if not order:
+        cursor.close()
+        conn.close()
+        return None
+
+    cursor.execute("""
+        SELECT id, product_id, product_code, product_name,
+               quantity, unit_price, total_price
+        FROM order_items
+        WHERE order_id = %s
+    """, (order_id,))
+    items = cursor.fetchall()
+
+    cursor.close()
+    conn.close()
+
+    order_dict = dict(order)
+    order_dict['items'] = [dict(item) for item in items]
+    return order_dict
+
+
+def wait_for_order_status(order_id, status, timeout):
+    """
+    Long-poll: čeka da narudžbina dobije traženi status ili da istekne
+    timeout. Narudžbina se čita tek kad je LISTEN aktivan, pa promena posle
+    čitanja stiže kao događaj. 'resync' ili prepunjena pretplata (odbačeni
+    događaji) znače ponovno čitanje, a i po isteku se vraća sveže stanje.
+    Vraća (narudžbina, timed_out).
+    """
+    deadline = time.monotonic() + timeout
+    subscription = order_events.subscribe(wait=timeout)
+    try:
+        order = fetch_order(order_id)
+        while order and order['status'] != status:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                order = fetch_order(order_id)
+                return order, bool(order) and order['status'] != status
+
+            if subscription.overflowed:
+                order_events.unsubscribe(subscription)
+                subscription = order_events.subscribe()
+                order = fetch_order(order_id)
+                continue
+
+            event = subscription.get(timeout=remaining)
+            if event is None:
+                continue
+            event_type, data = event
+            if event_type == 'order' and json.loads(data).get('id') != order_id:
+                continue
+            # Promena ove narudžbine ili resync: stanje se čita iz baze
+            order = fetch_order(order_id)
+        return order, False
+    finally:
+        order_events.unsubscribe(subscription)
+
+
 @app.route('/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
+    """
+    GET /orders/<id>?wait_for=completed&timeout=30 drži zahtev dok narudžbina
+    ne dobije status wait_for (najviše LONG_POLL_MAX_SECONDS); posle isteka
+    vraća trenutno stanje sa timed_out: true.
+    """
     try:
+        wait_for = request.args.get('wait_for')
+        if wait_for is None:
+            order = fetch_order(order_id)
+            timed_out = None
+        else:
+            valid_statuses = ['pending', 'processing', 'completed']
+            if wait_for not in valid_statuses:
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid wait_for. Must be one of: {valid_statuses}'
+                }), 400
+            try:
+                timeout = float(request.args.get('timeout', Config.LONG_POLL_MAX_SECONDS))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'timeout must be a number'}), 400
+            timeout = min(max(timeout, 0), Config.LONG_POLL_MAX_SECONDS)
+
+            order, timed_out = wait_for_order_status(order_id, wait_for, timeout)
+
+        if not order:
+            return jsonify({'success': False, 'error': 'Order not found'}), 404
+
+        response = {'success': True, 'order': order}
+        if timed_out is not None:
+            response['timed_out'] = timed_out
+        return jsonify(response), 200
+
+    except Exception as e:
+        logger.error(f"Error fetching order {order_id}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/orders/batch', methods=['GET'])
+def get_orders_batch():
+    """
+    GET /orders/batch?ids=1,2,3 - više narudžbina sa stavkama u dva upita.
+    Cene i datumi su u istom obliku kao u poruci za fakturu (float, ISO 8601).
+    """
+    try:
+        try:
+            order_ids = list(dict.fromkeys(
+                int(order_id) for order_id in request.args.get('ids', '').split(',') if order_id
+            ))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'ids must be a comma-separated list of integers'}), 400
+
+        if not order_ids:
+            return jsonify({'success': False, 'error': 'ids is required'}), 400
+        if len(order_ids) > Config.ORDER_BATCH_MAX_IDS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {Config.ORDER_BATCH_MAX_IDS} ids per request'
+            }), 400
+
         conn = get_db_connection()
         cursor = conn.cursor(cursor_factory=RealDictCursor)
 
@@ -107,33 +310,53 @@ def get_order(order_id):
             SELECT id, order_number, customer_id, customer_name,
                    status, total_price, pdf_url, created_at, updated_at
             FROM orders
-            WHERE id = %s
-        """, (order_id,))
-        order = cursor.fetchone()
-
-        if not order:
-            cursor.close()
-            conn.close()
-            return jsonify({'success': False, 'error': 'Order not found'}), 404
+            WHERE id = ANY(%s)
+            ORDER BY id
+        """, (order_ids,))
+        orders = cursor.fetchall()
 
         cursor.execute("""
-            SELECT id, product_id, product_code, product_name,
+            SELECT order_id, product_id, product_code, product_name,
                    quantity, unit_price, total_price
             FROM order_items
-            WHERE order_id = %s
-        """, (order_id,))
+            WHERE order_id = ANY(%s)
+            ORDER BY order_id, id
+        """, (order_ids,))
         items = cursor.fetchall()
 
         cursor.close()
         conn.close()
 
-        order_dict = dict(order)
-        order_dict['items'] = [dict(item) for item in items]
+        items_by_order = {}
+        for item in items:
+            items_by_order.setdefault(item['order_id'], []).append({
+                'product_id': item['product_id'],
+                'product_code': item['product_code'],
+                'product_name': item['product_name'],
+                'quantity': item['quantity'],
+                'unit_price': float(item['unit_price']),
+                'total_price': float(item['total_price'])
+            })
 
-        return jsonify({'success': True, 'order': order_dict}), 200
+        result = []
+        for order in orders:
+            order_dict = dict(order)
+            order_dict['total_price'] = float(order['total_price'])
+            order_dict['created_at'] = order['created_at'].isoformat()
+            order_dict['updated_at'] = order['updated_at'].isoformat()
+            order_dict['items'] = items_by_order.get(order['id'], [])
+            result.append(order_dict)
+
+        found_ids = {order['id'] for order in orders}
+        return jsonify({
+            'success': True,
+            'count': len(result),
+            'orders': result,
+            'not_found': [order_id for order_id in order_ids if order_id not in found_ids]
+        }), 200
 
     except Exception as e:
-        logger.error(f"Error fetching order {order_id}: {e}")
+        logger.error(f"Error fetching order batch: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -156,6 +379,13 @@ def create_order():
         if not items or len(items) == 0:
             return jsonify({'success': False, 'error': 'At least one item is required'}), 400
 
+        priority = data.get('priority', 'realtime')
+        if priority not in Config.INVOICE_PRIORITY_QUEUES:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid priority. Must be one of: {list(Config.INVOICE_PRIORITY_QUEUES)}'
+            }), 400
+
         for item in items:
             if not item.get('product_id'):
                 return jsonify({'success': False, 'error': 'product_id is required for each item'}), 400
@@ -196,6 +426,7 @@ def create_order():
             cursor = conn.cursor(cursor_factory=RealDictCursor)
 
             order_number = generate_order_number()
+            tracing.set_attribute('order.number', order_number)
 
             total_price = sum(
                 product_info[item['product_id']]['price'] * item['quantity']
@@ -242,7 +473,8 @@ def create_order():
             cursor.close()
             conn.close()
 
-            logger.info(f"Order {order_number} created in database")
+            logger.info(f"Order {order_number} created in database "
+                        f"(trace {tracing.current_trace_id()})")
 
         except Exception as db_error:
             logger.error(f"Database error, releasing stock: {db_error}")
@@ -271,7 +503,8 @@ def create_order():
                 customer_id=customer_id,
                 customer_name=customer_name,
                 items=queue_items,
-                total_price=float(total_price)
+                total_price=float(total_price),
+                priority=priority
             )
             logger.info(f"Invoice message sent to queue for order {order_number}")
 
@@ -281,6 +514,7 @@ def create_order():
         return jsonify({
             'success': True,
             'message': 'Order created successfully',
+            'trace_id': tracing.current_trace_id(),
             'order': {
                 'id': order_id,
                 'order_number': order_number,
@@ -332,6 +566,8 @@ def update_order_status(order_id):
         """, (new_status, pdf_url, order_id))
 
         updated_order = cursor.fetchone()
+        if updated_order:
+            notify_order_changes(cursor, [updated_order])
         conn.commit()
         cursor.close()
         conn.close()
@@ -350,15 +586,6 @@ def update_order_status(order_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-if __name__ == '__main__':
-    logger.info(f"Starting Order Service on {Config.SERVICE_HOST}:{Config.SERVICE_PORT}")
-    app.run(
-        host=Config.SERVICE_HOST,
-        port=Config.SERVICE_PORT,
-        debug=Config.DEBUG
-    )
-
-
 @app.route('/orders/<int:order_id>/invoice', methods=['POST'])
 def update_invoice(order_id):
     try:
@@ -391,6 +618,8 @@ def update_invoice(order_id):
         """, (new_status, pdf_url, order_id))
         
         updated_order = cursor.fetchone()
+        if updated_order:
+            notify_order_changes(cursor, [updated_order])
         conn.commit()
         cursor.close()
         conn.close()
@@ -415,3 +644,100 @@ def update_invoice(order_id):
             'success': False,
             'error': str(e)
         }), 500
+
+
+@app.route('/orders/invoices', methods=['POST'])
+def update_invoices():
+    try:
+        data = request.json
+        invoices = data.get('invoices') if isinstance(data, dict) else None
+
+        if not invoices or not isinstance(invoices, list):
+            return jsonify({
+                'success': False,
+                'error': 'invoices must be a non-empty list'
+            }), 400
+
+        valid_statuses = ['pending', 'processing', 'completed']
+        rows = {}
+        for invoice in invoices:
+            if not isinstance(invoice, dict) or not invoice.get('order_id') or not invoice.get('pdf_url'):
+                return jsonify({
+                    'success': False,
+                    'error': 'order_id and pdf_url are required for each invoice'
+                }), 400
+
+            order_id = invoice['order_id']
+            if isinstance(order_id, str) and order_id.isdigit():
+                order_id = int(order_id)
+            if isinstance(order_id, bool) or not isinstance(order_id, int) or order_id <= 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'order_id must be a positive integer'
+                }), 400
+
+            if not isinstance(invoice['pdf_url'], str):
+                return jsonify({
+                    'success': False,
+                    'error': 'pdf_url must be a string'
+                }), 400
+
+            # "status": null menja samo pdf_url (regeneracija postojećih faktura)
+            new_status = invoice.get('status', 'completed')
+            if new_status is not None and new_status not in valid_statuses:
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid status. Must be one of: {valid_statuses}'
+                }), 400
+
+            # Ako se ista narudžbina pojavi više puta, važi poslednji unos
+            rows[order_id] = (new_status, invoice['pdf_url'])
+
+        conn = get_db_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+        updated_orders = execute_values(cursor, """
+            UPDATE orders
+            SET status = COALESCE(v.status, orders.status), pdf_url = v.pdf_url,
+                updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(id, status, pdf_url)
+            WHERE orders.id = v.id
+            RETURNING orders.id, orders.order_number, orders.status,
+                      orders.pdf_url, orders.updated_at
+        """, [
+            (order_id, new_status, pdf_url)
+            for order_id, (new_status, pdf_url) in rows.items()
+        ], template='(%s::integer, %s::varchar, %s::text)', fetch=True)
+
+        notify_order_changes(cursor, updated_orders)
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+        updated_ids = {order['id'] for order in updated_orders}
+        not_found = [order_id for order_id in rows if order_id not in updated_ids]
+
+        logger.info(f"Invoices updated for {len(updated_orders)} orders")
+
+        return jsonify({
+            'success': True,
+            'updated': len(updated_orders),
+            'orders': [dict(order) for order in updated_orders],
+            'not_found': not_found
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error updating invoices: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+if __name__ == '__main__':
+    logger.info(f"Starting Order Service on {Config.SERVICE_HOST}:{Config.SERVICE_PORT}")
+    app.run(
+        host=Config.SERVICE_HOST,
+        port=Config.SERVICE_PORT,
+        debug=Config.DEBUG
+    )
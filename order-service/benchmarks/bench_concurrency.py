@@ -0,0 +1,169 @@
+"""
+Load test gunicorn worker klasa (sync, gthread, gevent)
+Pokreće gunicorn sa gunicorn.conf.py servisa i demo rutom koja, kao
+POST /orders, čeka na spor Catalog Service (stub sa --upstream-latency)
+preko CatalogClient-a, pa meri propusnost i kašnjenje pri rastućem broju
+istovremenih klijenata.
+
+python order-service/benchmarks/bench_concurrency.py
+python order-service/benchmarks/bench_concurrency.py --worker-classes gthread gevent --concurrency 50 200 500
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+# Demo aplikacija koju gunicorn učitava kao bench_concurrency:app
+if os.getenv('BENCH_APP'):
+    from flask import Flask, jsonify
+    from catalog_client import CatalogClient
+
+    app = Flask(__name__)
+    catalog_client = CatalogClient()
+
+    @app.route('/slow')
+    def slow():
+        return jsonify({'product': catalog_client.get_product(1)})
+
+
+def serve_upstream(port, latency):
+    """Catalog Service stub koji na svaki zahtev odgovara posle latency sekundi."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = b'{"product": {"id": 1, "stock_quantity": 10}}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    Server(('127.0.0.1', port), Handler).serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(worker_class, workers, port, upstream_url):
+    env = dict(
+        os.environ,
+        BENCH_APP='1',
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=str(workers),
+        ORDER_SERVICE_PORT=str(port),
+        CATALOG_SERVICE_URL=upstream_url,
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(SERVICE_DIR, 'gunicorn.conf.py'),
+         '--chdir', os.path.dirname(os.path.abspath(__file__)), 'bench_concurrency:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start on port {port}")
+
+
+def run_load(url, concurrency, seconds):
+    import requests
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        nonlocal errors
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+    return len(latencies) / elapsed, p50, p99, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gunicorn worker class load test')
+    parser.add_argument('--worker-classes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 200])
+    parser.add_argument('--upstream-latency', type=float, default=0.1,
+                        help='seconds the Catalog Service stub waits per request')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Stub i load generator su u odvojenim procesima, da ne dele GIL
+    upstream_port = free_port()
+    upstream = multiprocessing.Process(
+        target=serve_upstream, args=(upstream_port, args.upstream_latency), daemon=True
+    )
+    upstream.start()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+
+    print(f"{args.workers} workers, upstream latency {args.upstream_latency * 1000:.0f} ms")
+    print(f"{'worker':<8} {'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for worker_class in args.worker_classes:
+        port = free_port()
+        process = start_gunicorn(worker_class, args.workers, port, upstream_url)
+        try:
+            url = f"http://127.0.0.1:{port}/slow"
+            run_load(url, 1, 1.0)  # warm-up
+            for concurrency in args.concurrency:
+                rate, p50, p99, errors = run_load(url, concurrency, args.seconds)
+                print(f"{worker_class:<8} {concurrency:>8} {rate:>9.1f} "
+                      f"{p50 * 1000:>8.0f} {p99 * 1000:>8.0f} {errors:>7}")
+        finally:
+            process.terminate()
+            process.wait()
+
+    upstream.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark JSON provider-a (Flask default vs orjson) na odgovoru GET /orders
+python order-service/benchmarks/bench_json.py --orders 10000 --items 3
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify
+from json_provider import PROVIDERS
+
+
+def build_orders(order_count, item_count):
+    """Redovi kakve vraća RealDictCursor: Decimal cene i datetime kolone."""
+    created = datetime(2026, 1, 1, 10, 0, 0)
+    orders = []
+    for order_id in range(1, order_count + 1):
+        items = [{
+            'id': order_id * 10 + i,
+            'product_id': i,
+            'product_code': f'PROD-{i:03d}',
+            'product_name': f'Proizvod {i}',
+            'quantity': i,
+            'unit_price': Decimal('19.99'),
+            'total_price': Decimal('19.99') * i
+        } for i in range(1, item_count + 1)]
+        orders.append({
+            'id': order_id,
+            'order_number': f'ORD-20260101-{order_id:08X}',
+            'customer_id': 'CUST-001',
+            'customer_name': 'Marko Markovic',
+            'status': 'completed',
+            'total_price': sum(item['total_price'] for item in items),
+            'pdf_url': f'https://storage.example/invoices/{order_id}.pdf',
+            'created_at': created + timedelta(minutes=order_id),
+            'updated_at': created + timedelta(minutes=order_id, seconds=30),
+            'items': items
+        })
+    return orders
+
+
+def bench(provider, orders, repeat):
+    app = Flask(__name__)
+    app.json = PROVIDERS[provider](app)
+    payload = {'success': True, 'count': len(orders), 'orders': orders}
+
+    with app.app_context():
+        size = len(jsonify(payload).get_data())  # warm-up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            jsonify(payload).get_data()
+            timings.append(time.perf_counter() - start)
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON provider benchmark')
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--items', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    orders = build_orders(args.orders, args.items)
+    print(f"{args.orders} orders x {args.items} items")
+    print(f"{'provider':<10} {'ms':>8} {'bytes':>10}")
+    results = {}
+    for provider in PROVIDERS:
+        seconds, size = bench(provider, orders, args.repeat)
+        results[provider] = seconds
+        print(f"{provider:<10} {seconds * 1000:>8.1f} {size:>10}")
+    print(f"speedup: {results['default'] / results['orjson']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,59 @@
+"""
+Catalog Service Client
+Pooled requests.Session: keep-alive konekcije ka Catalog Service-u se
+dele između zahteva, umesto nove TCP konekcije po pozivu. Trajanje svakog
+poziva se meri po operaciji i ishodu (catalog_client_request_duration_seconds),
+a traceparent zaglavlje nastavlja trace narudžbine u Catalog Service-u.
+"""
+import time
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from prometheus_client import Histogram
 from config import Config
+from metrics import LATENCY_BUCKETS
+import tracing
 
 logger = logging.getLogger(__name__)
 
+catalog_request_seconds = Histogram(
+    'catalog_client_request_duration_seconds',
+    'Duration of calls to the Catalog Service, by operation and outcome',
+    ['operation', 'outcome'], buckets=LATENCY_BUCKETS
+)
+
 
 class CatalogClient:
 
-    def __init__(self):
+    def __init__(self, pool_size=Config.CATALOG_CLIENT_POOL_SIZE):
         self.base_url = Config.CATALOG_SERVICE_URL
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method, operation, path, **kwargs):
+        """outcome je HTTP status odgovora ili 'error' ako odgovora nije bilo."""
+        started = time.perf_counter()
+        outcome = 'error'
+        with tracing.span(f"catalog.{operation}", kind=tracing.CLIENT,
+                          attributes={'http.method': method, 'http.url': path}) as span:
+            try:
+                response = self.session.request(
+                    method, f"{self.base_url}{path}", headers=tracing.trace_headers(), **kwargs
+                )
+                outcome = str(response.status_code)
+                span.set_attribute('http.status_code', response.status_code)
+                return response
+            finally:
+                catalog_request_seconds.labels(operation=operation, outcome=outcome).observe(
+                    time.perf_counter() - started
+                )
 
     def get_product(self, product_id):
         try:
-            response = requests.get(
-                f"{self.base_url}/products/{product_id}",
+            response = self._request(
+                'GET', 'get_product', f"/products/{product_id}",
                 timeout=5
             )
             if response.status_code == 200:
@@ -32,8 +72,8 @@ class CatalogClient:
 
     def check_stock(self, items):
         try:
-            response = requests.post(
-                f"{self.base_url}/products/check-stock",
+            response = self._request(
+                'POST', 'check_stock', '/products/check-stock',
                 json=items,
                 timeout=5
             )
@@ -48,8 +88,8 @@ class CatalogClient:
 
     def reserve_stock(self, items):
         try:
-            response = requests.post(
-                f"{self.base_url}/products/reserve",
+            response = self._request(
+                'POST', 'reserve_stock', '/products/reserve',
                 json=items,
                 timeout=5
             )
@@ -64,8 +104,8 @@ class CatalogClient:
 
     def release_stock(self, items):
         try:
-            response = requests.post(
-                f"{self.base_url}/products/release",
+            response = self._request(
+                'POST', 'release_stock', '/products/release',
                 json=items,
                 timeout=5
             )
@@ -19,6 +19,11 @@ class Config:
     DB_PASSWORD = os.getenv('ORDER_DB_PASSWORD', 'orderpass123')
 
     CATALOG_SERVICE_URL = os.getenv('CATALOG_SERVICE_URL', 'http://localhost:5001')
+    # Keep-alive konekcije ka Catalog Service-u po worker procesu
+    CATALOG_CLIENT_POOL_SIZE = int(os.getenv('CATALOG_CLIENT_POOL_SIZE', '32'))
+
+    # Najviše narudžbina po GET /orders/batch zahtevu
+    ORDER_BATCH_MAX_IDS = int(os.getenv('ORDER_BATCH_MAX_IDS', '100'))
 
     # Azure Storage Queue
     AZURE_STORAGE_CONNECTION_STRING = os.getenv(
@@ -29,8 +34,52 @@ class Config:
         'QueueEndpoint=http://localhost:10001/devstoreaccount1;'
     )
     AZURE_QUEUE_NAME = os.getenv('AZURE_QUEUE_NAME', 'invoice-queue')
+    AZURE_BULK_QUEUE_NAME = os.getenv('AZURE_BULK_QUEUE_NAME', f'{AZURE_QUEUE_NAME}-bulk')
+    # Prioritet fakture -> red; worker opslužuje realtime red sa većom težinom
+    INVOICE_PRIORITY_QUEUES = {'realtime': AZURE_QUEUE_NAME, 'bulk': AZURE_BULK_QUEUE_NAME}
+    # 'full' - cela narudžbina u poruci; 'thin' - samo order_id, worker
+    # učitava narudžbine u batch-u preko GET /orders/batch
+    INVOICE_MESSAGE_MODE = os.getenv('INVOICE_MESSAGE_MODE', 'full')
+    # Payload-i faktura preveliki za poruku u redu (claim-check)
+    AZURE_PAYLOAD_CONTAINER = os.getenv('AZURE_BLOB_CONTAINER_PAYLOADS', 'invoice-payloads')
+
+    # GET /orders/events (SSE)
+    SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+    SSE_MAX_PENDING_EVENTS = int(os.getenv('SSE_MAX_PENDING_EVENTS', '100'))
+    # GET /orders/<id>?wait_for=...: najduže čekanje na promenu statusa
+    # (ispod proxy-read-timeout-a ingress-a od 60s)
+    LONG_POLL_MAX_SECONDS = int(os.getenv('LONG_POLL_MAX_SECONDS', '50'))
+
+    # Pool konekcija po gunicorn worker-u; u gevent modu ograničava broj
+    # istovremenih upita, ostali zahtevi čekaju slobodnu konekciju
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '5'))
+    # /readyz kešira rezultat provere baze
+    READINESS_CACHE_SECONDS = float(os.getenv('READINESS_CACHE_SECONDS', '5'))
+    # Upiti sporiji od ovoga se loguju (bez vrednosti parametara)
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '200'))
+
+    # Tracing (tracing.py): OTLP/JSON span-ovi u fajl i/ili na collector;
+    # bez oba se traceparent i dalje prenosi, ali se span-ovi ne izvoze
+    TRACE_EXPORT_FILE = os.getenv('TRACE_EXPORT_FILE', '')
+    TRACE_COLLECTOR_URL = os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', '')
+    TRACE_SAMPLE_RATIO = float(os.getenv('TRACE_SAMPLE_RATIO', '1.0'))
+
+    # GET /admin/profile (profiler.py): bez tokena endpoint nije registrovan.
+    # Trajanje ispod GUNICORN_TIMEOUT-a, da gunicorn ne ubije worker
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '30'))
 
     # Flask
+    # JSON serializacija odgovora: 'orjson' ili 'default' (stdlib json)
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    # Kompresija odgovora (Accept-Encoding), redosled je prioritet servera
+    COMPRESS_ALGORITHMS = [
+        name.strip() for name in os.getenv('COMPRESS_ALGORITHMS', 'br,gzip').split(',') if name.strip()
+    ]
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', '4'))
     SERVICE_HOST = os.getenv('ORDER_SERVICE_HOST', '0.0.0.0')
     SERVICE_PORT = int(os.getenv('ORDER_SERVICE_PORT', '5002'))
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,243 @@
+"""
+Database Connections
+Pool konekcija ka bazi, deljen između thread-ova (gthread) ili greenlet-a
+(gevent) jednog gunicorn worker-a. Broj istovremeno zauzetih konekcija
+ograničava semafor, pa hiljade gevent zahteva ne otvaraju hiljade
+konekcija: višak čeka na slobodnu konekciju najviše DB_POOL_TIMEOUT_SECONDS.
+
+get_db_connection() vraća konekciju čiji close() je vraća u pool umesto da
+je zatvori, tako da postojeći kod (conn.close() na kraju rute) radi bez izmena.
+Kursori te konekcije mere trajanje svakog upita (db_query_duration_seconds,
+Server-Timing zaglavlje odgovora), a upiti sporiji od SLOW_QUERY_THRESHOLD_MS
+se loguju bez vrednosti parametara.
+
+Isti modul postoji u order-service i catalog-service.
+"""
+import re
+import time
+import logging
+import threading
+import psycopg2
+import psycopg2.extensions
+from config import Config
+from metrics import observe_query
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Konekcije se otvaraju po potrebi, a slobodne se čuvaju za sledeći zahtev.
+    Semafor i lock su iz threading modula, pa ih gevent monkey patch čini
+    kooperativnim.
+    """
+
+    def __init__(self, db_params, max_size, timeout):
+        self.db_params = db_params
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout(
+                f"No database connection available within {timeout}s "
+                f"(pool size {self.max_size})"
+            )
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None or conn.closed:
+                conn = psycopg2.connect(**self.db_params)
+            return PooledConnection(self, conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            if not conn.closed:
+                status = conn.info.transaction_status
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    # Veza je pukla; nova se otvara pri sledećem getconn
+                    conn.close()
+                else:
+                    if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    with self._lock:
+                        self._idle.append(conn)
+        except Exception as e:
+            logger.warning(f"Discarding database connection: {e}")
+            try:
+                conn.close()
+            except Exception:
+                pass
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_SLOW_QUERY_SECONDS = Config.SLOW_QUERY_THRESHOLD_MS / 1000
+_MAX_LOGGED_QUERY_CHARS = 1000
+
+# Literali u SQL-u (execute_values ugrađuje vrednosti u sam upit)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def redact_query(query):
+    """SQL bez vrednosti: literali postaju ?, višestruki razmaci jedan."""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    query = _STRING_LITERAL.sub('?', query)
+    query = _NUMBER_LITERAL.sub('?', query)
+    query = _WHITESPACE.sub(' ', query).strip()
+    if len(query) > _MAX_LOGGED_QUERY_CHARS:
+        query = query[:_MAX_LOGGED_QUERY_CHARS] + '...'
+    return query
+
+
+def _query_finished(query, params, seconds):
+    observe_query(query, seconds)
+    if seconds >= _SLOW_QUERY_SECONDS:
+        count = len(params) if params is not None and hasattr(params, '__len__') else 0
+        logger.warning(
+            f"Slow query ({seconds * 1000:.0f} ms, {count} params redacted, "
+            f"trace {tracing.current_trace_id()}): {redact_query(query)}"
+        )
+
+
+_timed_cursor_classes = {}
+
+
+def timed_cursor_class(base):
+    """Podklasa cursor_factory-ja (npr. RealDictCursor) koja meri execute."""
+    cursor_class = _timed_cursor_classes.get(base)
+    if cursor_class is None:
+        class TimedCursor(base):
+            def execute(self, query, vars=None):
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    _query_finished(query, vars, time.perf_counter() - started)
+
+            def executemany(self, query, vars_list):
+                started = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    _query_finished(query, vars_list, time.perf_counter() - started)
+
+        TimedCursor.__name__ = f'Timed{base.__name__}'
+        cursor_class = _timed_cursor_classes.setdefault(base, TimedCursor)
+    return cursor_class
+
+
+class PooledConnection:
+    """Omotač oko psycopg2 konekcije; close() je vraća u pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def _connection(self):
+        if self._conn is None:
+            raise psycopg2.InterfaceError('connection already returned to the pool')
+        return self._conn
+
+    def __getattr__(self, name):
+        return getattr(self._connection(), name)
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def cursor(self, *args, cursor_factory=None, **kwargs):
+        return self._connection().cursor(
+            *args,
+            cursor_factory=timed_cursor_class(cursor_factory or psycopg2.extensions.cursor),
+            **kwargs
+        )
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn)
+
+    def __del__(self):
+        # Ruta koja na grešci ne pozove close() ne sme trajno da zauzme mesto u pool-u
+        if getattr(self, '_conn', None) is not None:
+            self.close()
+
+
+class ReadinessCheck:
+    """
+    Provera baze za /readyz: SELECT 1 na konekciji iz pool-a, a rezultat se
+    kešira cache_seconds, pa česte probe ne opterećuju bazu. Pun pool znači
+    da je baza dostupna, samo zauzeta, i ne vadi pod iz Service-a.
+    """
+
+    def __init__(self, pool, cache_seconds, timeout=1.0):
+        self.pool = pool
+        self.cache_seconds = cache_seconds
+        self.timeout = timeout
+        self._result = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Vraća (ready, detalj)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.cache_seconds:
+                self._result = self._check_database()
+                self._checked_at = now
+            return self._result
+
+    def _check_database(self):
+        try:
+            conn = self.pool.getconn(timeout=self.timeout)
+        except PoolTimeout:
+            return True, 'busy'
+        except Exception as e:
+            logger.warning(f"Readiness check failed: {e}")
+            return False, str(e)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True, 'ok'
+        except Exception as e:
+            logger.warning(f"Readiness check failed: {e}")
+            return False, str(e)
+        finally:
+            conn.close()
+
+
+pool = ConnectionPool(
+    Config.get_db_params(),
+    max_size=Config.DB_POOL_SIZE,
+    timeout=Config.DB_POOL_TIMEOUT_SECONDS
+)
+
+
+def get_db_connection():
+    try:
+        return pool.getconn()
+    except Exception as e:
+        logger.error(f"Database connection error: {e}")
+        raise
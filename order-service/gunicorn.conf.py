@@ -0,0 +1,48 @@
+"""
+Gunicorn konfiguracija
+Način posluživanja se bira preko GUNICORN_WORKER_CLASS:
+  gthread (podrazumevano) - GUNICORN_THREADS zahteva po worker procesu
+  gevent                  - GUNICORN_WORKER_CONNECTIONS greenlet-a po procesu;
+                            psycopg2 i requests (socket) postaju kooperativni,
+                            pa spor upit ili poziv Catalog Service-a ne blokira
+                            ostale zahteve
+  sync                    - jedan zahtev po procesu
+
+gunicorn -c gunicorn.conf.py app:app
+"""
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('ORDER_SERVICE_PORT', '5002')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+# Uz threads > 1 gunicorn sync worker tiho zamenjuje gthread-om
+threads = int(os.getenv('GUNICORN_THREADS', '32' if worker_class == 'gthread' else '1'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '25'))
+
+# prometheus_client multiprocess mod: svaki worker piše metrike u ovaj
+# direktorijum, /metrics ih sabira (metrics.py)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-order-service')
+
+
+def on_starting(server):
+    # Vrednosti iz prethodnog pokretanja ne smeju ući u nove brojače
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    if worker.cfg.worker_class_str == 'gevent':
+        # gevent worker monkey-patch-uje socket, ali libpq čeka na odgovor
+        # baze u C kodu; wait callback prepušta čekanje gevent hub-u
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        worker.log.info('psycopg2 patched for gevent')
@@ -0,0 +1,81 @@
+"""
+JSON Provider
+orjson umesto stdlib json encoder-a za sve jsonify odgovore i request.get_json.
+Izlaz je isti kao sa Flask-ovim podrazumevanim provider-om, pa klijenti ne
+primećuju razliku: Decimal (NUMERIC kolone iz RealDictCursor-a) postaje
+string, a date/datetime HTTP datum ("Wed, 21 Oct 2015 07:28:00 GMT").
+Jedina razlika je što ključevi nisu sortirani.
+
+Bira se preko JSON_PROVIDER ('orjson' ili 'default').
+
+Isti modul postoji u order-service i catalog-service.
+"""
+import uuid
+import decimal
+import dataclasses
+from datetime import date, datetime, timezone
+import orjson
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# orjson bi datetime serijalizovao kao ISO 8601; passthrough ga šalje u _default
+_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _http_date(value):
+    """Isto što i werkzeug.http.http_date, bez email.utils (dvostruko brže)."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+    else:
+        value = datetime(value.year, value.month, value.day)
+    return (f"{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} "
+            f"{value.year:04d} {value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT")
+
+
+def _default(o):
+    if isinstance(o, date):
+        return _http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = _OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        # bytes direktno u Response, bez dekodiranja u str i nazad
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=option), mimetype=self.mimetype
+        )
+
+
+PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'default': DefaultJSONProvider,
+}
+
+
+def init_json(app, name):
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown JSON provider '{name}', expected one of {sorted(PROVIDERS)}")
+    app.json = PROVIDERS[name](app)
@@ -0,0 +1,116 @@
+"""
+Invoice Message Codec
+Kompaktan format poruka u redu faktura: msgpack + zlib sa bajtom verzije,
+base64 kodiran jer Azure Storage Queue prima tekst.
+
+Azure poruka je ograničena na 64 KB, pa se payload veći od
+MAX_INLINE_MESSAGE_BYTES (claim-check) smešta u blob, a u red ide samo
+referenca; blob briše worker kada poruka napusti red (obrađena ili
+prebačena u poison red). Stare JSON poruke se i dalje čitaju.
+
+Isti modul postoji u order-service i invoice-worker; izmene formata
+moraju ići u oba, uz novu verziju.
+"""
+import json
+import zlib
+import base64
+import msgpack
+
+# Prvi bajt dekodiranog sadržaja
+VERSION_MSGPACK_ZLIB = 1
+VERSION_CLAIM_CHECK = 2
+
+# Ostavlja prostor za XML omotač poruke do limita od 64 KB
+MAX_INLINE_MESSAGE_BYTES = 60 * 1024
+
+
+class MessageDecodeError(ValueError):
+    pass
+
+
+def _frame(version, body):
+    return base64.b64encode(bytes([version]) + body).decode('ascii')
+
+
+def encode_payload(data):
+    """Binarni payload (verzija + msgpack/zlib), isti oblik koji ide u blob."""
+    return bytes([VERSION_MSGPACK_ZLIB]) + zlib.compress(msgpack.packb(data, use_bin_type=True))
+
+
+def encode_message(data, offload=None):
+    """
+    Vraća tekst poruke za red. Ako je poruka prevelika, offload(payload) mora
+    sačuvati payload i vratiti njegovo ime (npr. naziv bloba).
+    """
+    payload = encode_payload(data)
+    content = base64.b64encode(payload).decode('ascii')
+    if len(content) <= MAX_INLINE_MESSAGE_BYTES:
+        return content
+
+    if offload is None:
+        raise ValueError(
+            f"Encoded message is {len(content)} bytes, over the "
+            f"{MAX_INLINE_MESSAGE_BYTES} byte queue limit, and no offload is configured"
+        )
+    reference = offload(payload)
+    return _frame(VERSION_CLAIM_CHECK, msgpack.packb({'blob': reference}, use_bin_type=True))
+
+
+def decode_payload(payload):
+    if not payload or payload[0] != VERSION_MSGPACK_ZLIB:
+        raise MessageDecodeError(f"Unsupported payload version: {payload[:1]!r}")
+    try:
+        return msgpack.unpackb(zlib.decompress(payload[1:]), raw=False)
+    except (zlib.error, msgpack.UnpackException, ValueError) as e:
+        raise MessageDecodeError(f"Corrupt payload: {e}") from e
+
+
+def decode_message(content, fetch=None):
+    """
+    Dekodira tekst poruke. fetch(reference) vraća payload sačuvan u blobu i
+    potreban je samo za claim-check poruke.
+    """
+    if content.lstrip().startswith('{'):
+        # Poruke poslate pre uvođenja binarnog formata
+        try:
+            return json.loads(content)
+        except ValueError as e:
+            raise MessageDecodeError(f"Invalid JSON message: {e}") from e
+
+    frame = _decode_frame(content)
+    version = frame[0]
+    if version == VERSION_MSGPACK_ZLIB:
+        return decode_payload(frame)
+    if version == VERSION_CLAIM_CHECK:
+        if fetch is None:
+            raise MessageDecodeError("Claim-check message received but no fetch is configured")
+        return decode_payload(fetch(_claim_check_reference(frame)))
+
+    raise MessageDecodeError(f"Unsupported message version: {version}")
+
+
+def claim_check_reference(content):
+    """Naziv bloba sa payload-om claim-check poruke, None za ostale poruke."""
+    if content.lstrip().startswith('{'):
+        return None
+    frame = _decode_frame(content)
+    if frame[0] != VERSION_CLAIM_CHECK:
+        return None
+    return _claim_check_reference(frame)
+
+
+def _claim_check_reference(frame):
+    try:
+        return msgpack.unpackb(frame[1:], raw=False)['blob']
+    except (msgpack.UnpackException, ValueError, KeyError, TypeError) as e:
+        raise MessageDecodeError(f"Corrupt claim-check reference: {e}") from e
+
+
+def _decode_frame(content):
+    try:
+        frame = base64.b64decode(content, validate=True)
+    except (ValueError, TypeError) as e:
+        raise MessageDecodeError(f"Message is neither JSON nor base64: {e}") from e
+    if not frame:
+        raise MessageDecodeError("Empty message")
+    return frame
@@ -0,0 +1,194 @@
+"""
+Order Events
+Promene statusa i pdf_url-a narudžbina se objavljuju preko Postgres
+LISTEN/NOTIFY. Svaki proces ima jedan deljeni listener (jednu konekciju ka
+bazi) koji događaje prosleđuje svim pretplatnicima, npr. SSE klijentima na
+GET /orders/events. Listener se pokreće sa prvim pretplatnikom, a gasi (i
+zatvara konekciju) kad posle poslednjeg prođe idle_timeout sekundi.
+"""
+import json
+import time
+import queue
+import select
+import logging
+import threading
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'order_events'
+
+# Postgres ograničava NOTIFY payload na 8000 bajtova
+MAX_PAYLOAD_BYTES = 8000
+
+
+def order_event_payload(order):
+    return json.dumps({
+        'id': order['id'],
+        'order_number': order.get('order_number'),
+        'status': order.get('status'),
+        'pdf_url': order.get('pdf_url'),
+        'updated_at': order['updated_at'].isoformat() if order.get('updated_at') else None
+    })
+
+
+def notify_order_changes(cursor, orders):
+    """
+    Šalje NOTIFY za svaku promenjenu narudžbinu u okviru tekuće transakcije;
+    Postgres ih isporučuje tek posle commit-a.
+    """
+    payloads = [order_event_payload(order) for order in orders]
+    payloads = [payload for payload in payloads if len(payload.encode('utf-8')) < MAX_PAYLOAD_BYTES]
+    if not payloads:
+        return
+    cursor.execute(
+        "SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+        (CHANNEL, payloads)
+    )
+
+
+class Subscription:
+
+    def __init__(self, max_pending):
+        self._events = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            # Spor klijent: odbacuje se, pa se na reconnect sinhronizuje iznova
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Sledeći događaj (tip, data) ili None ako ga nije bilo za timeout sekundi."""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class _Listener:
+    """Stanje jednog pokretanja listener thread-a."""
+
+    def __init__(self):
+        self.stopped = threading.Event()
+        # Postavljen dok je LISTEN aktivan; posle prekida veze se briše
+        self.listening = threading.Event()
+        self.thread = None
+
+
+class OrderEventBroadcaster:
+    """
+    Jedan LISTEN po procesu, proizvoljan broj pretplatnika. Posle svakog
+    uspešnog LISTEN-a, i prvog, šalje se 'resync': NOTIFY-i iz perioda pre
+    LISTEN-a (pretplata pre nego što je listener počeo da sluša, prekid veze)
+    nisu isporučeni, pa pretplatnici ponovo čitaju stanje iz baze.
+    """
+
+    def __init__(self, db_params, max_pending=100, reconnect_delay=2.0, poll_timeout=5.0,
+                 idle_timeout=60.0):
+        self.db_params = db_params
+        self.max_pending = max_pending
+        self.reconnect_delay = reconnect_delay
+        self.poll_timeout = poll_timeout
+        self.idle_timeout = idle_timeout
+
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._idle_since = None
+
+    def subscribe(self, wait=0):
+        """
+        Nova pretplata. Sa wait > 0 čeka najviše toliko sekundi da LISTEN
+        bude aktivan, pa čitanje iz baze posle subscribe() ne može da
+        propusti promenu; vraća se i ako baza nije dostupna (stiže 'resync').
+        """
+        subscription = Subscription(self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+            self._idle_since = None
+            if self._listener is None:
+                self._listener = _Listener()
+                self._listener.thread = threading.Thread(
+                    target=self._run, args=(self._listener,),
+                    name='order-events-listener', daemon=True
+                )
+                self._listener.thread.start()
+            listener = self._listener
+        if wait > 0:
+            listener.listening.wait(wait)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not self._subscribers and self._idle_since is None:
+                self._idle_since = time.monotonic()
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    @property
+    def listening(self):
+        with self._lock:
+            return self._listener is not None and self._listener.listening.is_set()
+
+    def publish(self, event_type, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put((event_type, data))
+
+    def stop(self):
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stopped.set()
+
+    def _stop_if_idle(self, listener):
+        """Gasi listener ako nema pretplatnika duže od idle_timeout."""
+        with self._lock:
+            if (self._listener is listener and not self._subscribers
+                    and self._idle_since is not None
+                    and time.monotonic() - self._idle_since >= self.idle_timeout):
+                self._listener = None
+                listener.stopped.set()
+                logger.info(f"No order event subscribers, stopping listener on '{CHANNEL}'")
+        return listener.stopped.is_set()
+
+    def _run(self, listener):
+        while not self._stop_if_idle(listener):
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.db_params)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                logger.info(f"Listening for order events on '{CHANNEL}'")
+
+                listener.listening.set()
+                self.publish('resync', '{}')
+
+                self._listen(conn, listener)
+            except Exception as e:
+                logger.error(f"Order event listener error: {e}")
+            finally:
+                listener.listening.clear()
+                if conn is not None:
+                    conn.close()
+            listener.stopped.wait(self.reconnect_delay)
+
+    def _listen(self, conn, listener):
+        while not self._stop_if_idle(listener):
+            ready, _, _ = select.select([conn], [], [], self.poll_timeout)
+            if not ready:
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                self.publish('order', notify.payload)
@@ -1,8 +1,12 @@
-import json
+import uuid
 import logging
 from datetime import datetime
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob import BlobServiceClient
 from azure.storage.queue import QueueClient, QueueServiceClient
 from config import Config
+from message_codec import encode_message
+import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -11,44 +15,74 @@ class QueueMessageClient:
 
     def __init__(self):
         self.connection_string = Config.AZURE_STORAGE_CONNECTION_STRING
-        self.queue_name = Config.AZURE_QUEUE_NAME
+        self.queue_names = Config.INVOICE_PRIORITY_QUEUES
+        self.payload_container = Config.AZURE_PAYLOAD_CONTAINER
+        self._payload_container_client = None
         self._ensure_queue_exists()
 
     def _ensure_queue_exists(self):
-        try:
-            service_client = QueueServiceClient.from_connection_string(
-                self.connection_string
-            )
-            queue_client = service_client.get_queue_client(self.queue_name)
-            queue_client.create_queue()
-            logger.info(f"Queue '{self.queue_name}' is ready")
-        except Exception as e:
-            if "QueueAlreadyExists" not in str(e):
-                logger.warning(f"Could not ensure queue exists: {e}")
+        service_client = QueueServiceClient.from_connection_string(
+            self.connection_string
+        )
+        for queue_name in self.queue_names.values():
+            try:
+                service_client.get_queue_client(queue_name).create_queue()
+                logger.info(f"Queue '{queue_name}' is ready")
+            except Exception as e:
+                if "QueueAlreadyExists" not in str(e):
+                    logger.warning(f"Could not ensure queue '{queue_name}' exists: {e}")
+
+    def _store_payload(self, payload):
+        """Claim-check: prevelik payload ide u blob, u red samo njegov naziv."""
+        if self._payload_container_client is None:
+            blob_service = BlobServiceClient.from_connection_string(self.connection_string)
+            container_client = blob_service.get_container_client(self.payload_container)
+            try:
+                container_client.create_container()
+            except ResourceExistsError:
+                pass
+            self._payload_container_client = container_client
+
+        blob_name = f"{datetime.utcnow():%Y/%m/%d}/{uuid.uuid4().hex}.bin"
+        self._payload_container_client.upload_blob(blob_name, payload)
+        logger.info(f"Invoice payload ({len(payload)} bytes) stored as blob {blob_name}")
+        return blob_name
 
     def send_invoice_message(self, order_id, order_number, customer_id,
-                              customer_name, items, total_price):
+                              customer_name, items, total_price, priority='realtime'):
+
+        if priority not in self.queue_names:
+            raise ValueError(f"Unknown invoice priority '{priority}'")
 
         try:
-            message = {
-                'order_id': order_id,
-                'order_number': order_number,
-                'customer_id': customer_id,
-                'customer_name': customer_name,
-                'items': items,
-                'total_price': total_price,
-                'created_at': datetime.utcnow().isoformat()
-            }
+            if Config.INVOICE_MESSAGE_MODE == 'thin':
+                # Worker sam učitava narudžbinu; order_number je tu samo za logove
+                message = {'order_id': order_id, 'order_number': order_number}
+            else:
+                message = {
+                    'order_id': order_id,
+                    'order_number': order_number,
+                    'customer_id': customer_id,
+                    'customer_name': customer_name,
+                    'items': items,
+                    'total_price': total_price,
+                    'created_at': datetime.utcnow().isoformat()
+                }
 
             queue_client = QueueClient.from_connection_string(
                 self.connection_string,
-                self.queue_name
+                self.queue_names[priority]
             )
 
-            message_json = json.dumps(message)
-            queue_client.send_message(message_json)
+            with tracing.span('invoice.enqueue', kind=tracing.PRODUCER, attributes={
+                'messaging.destination': self.queue_names[priority],
+                'order.number': order_number
+            }) as span:
+                # Worker nastavlja trace iz poruke
+                message['traceparent'] = span.traceparent
+                queue_client.send_message(encode_message(message, offload=self._store_payload))
 
-            logger.info(f"Invoice message sent for order {order_number}")
+            logger.info(f"Invoice message sent for order {order_number} ({priority})")
             return True
 
         except Exception as e:
@@ -12,10 +12,22 @@ import pytest
 from unittest.mock import patch, MagicMock
 import sys
 import os
+import json
+import time
+import threading
+from datetime import datetime
+from decimal import Decimal
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import app
+from queue_client import QueueMessageClient
+from message_codec import decode_message, MAX_INLINE_MESSAGE_BYTES
+from order_events import OrderEventBroadcaster, notify_order_changes
+from db import ConnectionPool, PoolTimeout, ReadinessCheck, timed_cursor_class
+from json_provider import OrjsonProvider
+import tracing
+from flask.json.provider import DefaultJSONProvider
 
 
 @pytest.fixture
@@ -101,3 +113,663 @@ def test_create_order_validation(client):
     assert response.status_code == 400
     data = response.get_json()
     assert 'item' in data['error'].lower()
+
+    # Test 5: Nepoznat prioritet fakture
+    response = client.post('/orders',
+        json={
+            'customer_id': 'CUST-001',
+            'customer_name': 'Test Customer',
+            'items': [{'product_id': 1, 'quantity': 1}],
+            'priority': 'urgent'
+        },
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+    data = response.get_json()
+    assert 'priority' in data['error'].lower()
+
+
+@patch('app.execute_values')
+@patch('app.get_db_connection')
+def test_bulk_invoice_update(mock_db, mock_execute_values, client):
+    """
+    Unit Test 3: POST /orders/invoices ažurira više narudžbina jednim UPDATE-om
+    """
+    mock_conn = MagicMock()
+    mock_db.return_value = mock_conn
+    mock_execute_values.return_value = [
+        {'id': 1, 'order_number': 'ORD-1', 'status': 'completed',
+         'pdf_url': 'http://blob/1.pdf', 'updated_at': None},
+    ]
+
+    response = client.post('/orders/invoices', json={
+        'invoices': [
+            {'order_id': 1, 'pdf_url': 'http://blob/old.pdf'},
+            {'order_id': 1, 'pdf_url': 'http://blob/1.pdf'},
+            {'order_id': 2, 'pdf_url': 'http://blob/2.pdf'},
+        ]
+    })
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['updated'] == 1
+    assert data['not_found'] == [2]
+
+    rows = mock_execute_values.call_args[0][2]
+    assert rows == [(1, 'completed', 'http://blob/1.pdf'), (2, 'completed', 'http://blob/2.pdf')]
+    mock_conn.commit.assert_called_once()
+
+    # Bez statusa se menja samo pdf_url, a NOTIFY ide za sve ažurirane
+    with patch('app.notify_order_changes') as mock_notify:
+        response = client.post('/orders/invoices', json={
+            'invoices': [{'order_id': 1, 'pdf_url': 'http://blob/1.pdf', 'status': None}]
+        })
+    assert response.status_code == 200
+    assert mock_execute_values.call_args[0][2] == [(1, None, 'http://blob/1.pdf')]
+    assert 'COALESCE(v.status, orders.status)' in mock_execute_values.call_args[0][1]
+    mock_notify.assert_called_once()
+    assert mock_notify.call_args[0][1] == mock_execute_values.return_value
+
+    # Validacija pre bilo kakvog pristupa bazi
+    mock_db.reset_mock()
+    for invoices in ([{'order_id': 1}], ['ORD-1'], [{'order_id': 'abc', 'pdf_url': 'http://blob/1.pdf'}],
+                     [{'order_id': 1, 'pdf_url': 'http://blob/1.pdf', 'status': 'shipped'}]):
+        response = client.post('/orders/invoices', json={'invoices': invoices})
+        assert response.status_code == 400, invoices
+    mock_db.assert_not_called()
+
+    # Ruta je registrovana pre __main__ bloka (python app.py)
+    with open(os.path.join(os.path.dirname(__file__), '..', 'app.py')) as f:
+        source = f.read()
+    assert source.index("'/orders/invoices'") < source.index("if __name__ == '__main__':")
+
+
+def test_large_invoice_message_uses_claim_check():
+    """
+    Unit Test 4: Poruka se šalje kompaktno kodirana; prevelik payload ide u blob
+    """
+    items = [
+        {'product_code': f'PROD-{i:05d}', 'product_name': f'Proizvod broj {i} ' + os.urandom(8).hex(),
+         'quantity': 1, 'unit_price': 10.0 + i, 'total_price': 10.0 + i}
+        for i in range(3000)
+    ]
+    stored = {}
+
+    def store_payload(payload):
+        stored['blob-1'] = payload
+        return 'blob-1'
+
+    with patch('queue_client.QueueServiceClient'), patch('queue_client.QueueClient') as mock_queue:
+        client = QueueMessageClient()
+        client._store_payload = store_payload
+
+        client.send_invoice_message(1, 'ORD-1', 'CUST-1', 'Kupac', items[:2], 21.0)
+        small = mock_queue.from_connection_string.return_value.send_message.call_args[0][0]
+        assert not small.startswith('{')
+        assert decode_message(small)['items'] == items[:2]
+        assert not stored
+
+        client.send_invoice_message(2, 'ORD-2', 'CUST-1', 'Kupac', items, 1.0)
+        large = mock_queue.from_connection_string.return_value.send_message.call_args[0][0]
+
+    assert len(large) < 100 < MAX_INLINE_MESSAGE_BYTES
+    assert decode_message(large, fetch=stored.__getitem__)['items'] == items
+
+
+@patch('app.get_db_connection')
+def test_orders_batch_read(mock_db, client):
+    """
+    Unit Test 5: GET /orders/batch vraća više narudžbina sa stavkama u dva upita
+    """
+    created = datetime(2026, 1, 5, 10, 0)
+    cursor = mock_db.return_value.cursor.return_value
+    cursor.fetchall.side_effect = [
+        [{'id': 1, 'order_number': 'ORD-1', 'customer_id': 'CUST-1', 'customer_name': 'Kupac',
+          'status': 'pending', 'total_price': Decimal('21.00'), 'pdf_url': None,
+          'created_at': created, 'updated_at': created}],
+        [{'order_id': 1, 'product_id': 5, 'product_code': 'PROD-5', 'product_name': 'Miš',
+          'quantity': 2, 'unit_price': Decimal('10.50'), 'total_price': Decimal('21.00')}],
+    ]
+
+    response = client.get('/orders/batch?ids=1,2,1')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['not_found'] == [2]
+    order = data['orders'][0]
+    assert order['total_price'] == 21.0
+    assert order['created_at'] == '2026-01-05T10:00:00'
+    assert order['items'][0]['unit_price'] == 10.5
+    assert cursor.execute.call_count == 2
+    assert cursor.execute.call_args_list[0][0][1] == ([1, 2],)
+
+    assert client.get('/orders/batch?ids=a,b').status_code == 400
+
+
+def test_invoice_messages_are_routed_by_priority():
+    """
+    Unit Test 6: Poruka ide u red svog prioriteta (realtime ili bulk)
+    """
+    with patch('queue_client.QueueServiceClient'), patch('queue_client.QueueClient') as mock_queue:
+        client = QueueMessageClient()
+        client.send_invoice_message(1, 'ORD-1', 'CUST-1', 'Kupac', [], 0.0)
+        client.send_invoice_message(2, 'ORD-2', 'CUST-1', 'Kupac', [], 0.0, priority='bulk')
+
+        with pytest.raises(ValueError):
+            client.send_invoice_message(3, 'ORD-3', 'CUST-1', 'Kupac', [], 0.0, priority='urgent')
+
+    queues = [call.args[1] for call in mock_queue.from_connection_string.call_args_list]
+    assert queues == ['invoice-queue', 'invoice-queue-bulk']
+
+
+def test_order_events_stream(client):
+    """
+    Unit Test 7: GET /orders/events prosleđuje NOTIFY događaje SSE klijentima
+    """
+    broadcaster = OrderEventBroadcaster({}, max_pending=10)
+
+    with patch.object(OrderEventBroadcaster, '_run'), patch('app.order_events', broadcaster):
+        response = client.get('/orders/events', buffered=False,
+                              headers={'Accept-Encoding': 'br, gzip'})
+        assert response.headers['Content-Type'].startswith('text/event-stream')
+        assert response.headers['X-Accel-Buffering'] == 'no'
+        # Kompresija bi zadržavala događaje u baferu kompresora
+        assert 'Content-Encoding' not in response.headers
+
+        chunks = iter(response.response)
+        assert next(chunks) == b'retry: 3000\n\n'
+        assert broadcaster.subscriber_count == 1
+
+        broadcaster.publish('order', '{"id": 1, "status": "completed"}')
+        assert next(chunks) == b'event: order\ndata: {"id": 1, "status": "completed"}\n\n'
+
+        response.close()
+        assert broadcaster.subscriber_count == 0
+
+    cursor = MagicMock()
+    notify_order_changes(cursor, [{'id': 1, 'order_number': 'ORD-1', 'status': 'completed',
+                                   'pdf_url': 'http://blob/1.pdf', 'updated_at': None}])
+    channel, payloads = cursor.execute.call_args[0][1]
+    assert channel == 'order_events'
+    assert json.loads(payloads[0])['pdf_url'] == 'http://blob/1.pdf'
+
+
+@patch('app.fetch_order')
+def test_get_order_long_poll(mock_fetch, client):
+    """
+    Unit Test 8: GET /orders/<id>?wait_for=completed čeka NOTIFY za tu narudžbinu
+    """
+    pending = {'id': 1, 'status': 'pending', 'pdf_url': None}
+    completed = {'id': 1, 'status': 'completed', 'pdf_url': 'http://blob/1.pdf'}
+    database = {'order': pending}
+    mock_fetch.side_effect = lambda order_id: database['order']
+    broadcaster = OrderEventBroadcaster({}, max_pending=10, poll_timeout=0.05)
+
+    def complete():
+        database['order'] = completed
+        broadcaster.publish('order', '{"id": 2, "status": "completed"}')
+        broadcaster.publish('order', '{"id": 1, "status": "completed"}')
+
+    with patch('order_events.psycopg2.connect', side_effect=lambda **params: FakeListenConnection()), \
+            patch('app.order_events', broadcaster):
+        publisher = threading.Timer(0.1, complete)
+        publisher.start()
+
+        response = client.get('/orders/1?wait_for=completed&timeout=5')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['timed_out'] is False
+        assert data['order']['pdf_url'] == 'http://blob/1.pdf'
+
+        # Bez promene: posle timeout-a vraća trenutno stanje
+        database['order'] = pending
+        response = client.get('/orders/1?wait_for=completed&timeout=0.2')
+        assert response.get_json()['timed_out'] is True
+        assert broadcaster.subscriber_count == 0
+        broadcaster.stop()
+
+    assert client.get('/orders/1?wait_for=shipped').status_code == 400
+
+
+@patch('db.psycopg2.connect')
+def test_connection_pool_reuses_connections(mock_connect):
+    """
+    Unit Test 9: close() vraća konekciju u pool (uz rollback nezavršene
+    transakcije); pukla konekcija se odbacuje, a pun pool čeka pa odustaje
+    """
+    import psycopg2.extensions
+
+    mock_connect.side_effect = lambda **params: MagicMock(closed=0)
+    pool = ConnectionPool({}, max_size=2, timeout=0.1)
+
+    conn = pool.getconn()
+    raw = conn._conn
+    raw.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    conn.cursor()
+    conn.close()
+    raw.rollback.assert_called_once()
+    raw.close.assert_not_called()
+
+    # Ista konekcija se koristi ponovo
+    conn = pool.getconn()
+    assert conn._conn is raw
+    assert mock_connect.call_count == 1
+
+    other = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+    raw.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+    conn.close()
+    raw.close.assert_called_once()
+    other.close()
+
+    # Mesto pukle konekcije je oslobođeno, nova se otvara po potrebi
+    first, second = pool.getconn(), pool.getconn()
+    assert mock_connect.call_count == 3
+    first.close()
+    second.close()
+
+
+def test_orjson_provider_matches_default_output():
+    """
+    Unit Test 10: orjson provider serijalizuje Decimal i datetime isto kao
+    Flask-ov podrazumevani provider
+    """
+    from datetime import timezone, timedelta
+    row = {
+        'id': 1,
+        'total_price': Decimal('1234.50'),
+        'created_at': datetime(2026, 1, 2, 3, 4, 5),
+        'updated_at': datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))),
+        'items': [{'unit_price': Decimal('0.10'), 'product_name': 'Čaša'}],
+        'pdf_url': None,
+    }
+
+    assert isinstance(app.json, OrjsonProvider)
+    expected = json.loads(DefaultJSONProvider(app).dumps(row))
+    assert json.loads(app.json.dumps(row)) == expected
+    assert expected['total_price'] == '1234.50'
+    assert expected['updated_at'] == 'Fri, 02 Jan 2026 01:04:05 GMT'
+
+    with app.app_context():
+        from flask import jsonify
+        response = jsonify(orders=[row])
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == {'orders': [expected]}
+    assert app.json.loads('{"a": [1, 2]}') == {'a': [1, 2]}
+
+
+@patch('app.get_db_connection')
+def test_orders_list_is_compressed(mock_db, client):
+    """
+    Unit Test 11: Veliki JSON odgovor se kompresuje algoritmom koji klijent
+    prihvata (br, pa gzip); mali odgovori i klijenti bez Accept-Encoding ne
+    """
+    import gzip
+    import brotli
+
+    orders = [{
+        'id': i, 'order_number': f'ORD-20260101-{i:08d}', 'customer_id': 'CUST-001',
+        'customer_name': 'Marko Markovic', 'status': 'completed',
+        'total_price': Decimal('59.97'), 'pdf_url': None,
+        'created_at': datetime(2026, 1, 1), 'updated_at': datetime(2026, 1, 1)
+    } for i in range(1, 51)]
+    items = [{'id': 1, 'product_id': 1, 'product_code': 'PROD-001', 'product_name': 'Proizvod',
+              'quantity': 3, 'unit_price': Decimal('19.99'), 'total_price': Decimal('59.97')}]
+
+    mock_cursor = MagicMock()
+    mock_db.return_value.cursor.return_value = mock_cursor
+
+    mock_cursor.fetchall.side_effect = [orders] + [items] * len(orders)
+    response = client.get('/orders', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    data = json.loads(brotli.decompress(response.get_data()))
+    assert data['count'] == 50
+
+    mock_cursor.fetchall.side_effect = [orders] + [items] * len(orders)
+    response = client.get('/orders', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.get_data())) == data
+
+    mock_cursor.fetchall.side_effect = [orders] + [items] * len(orders)
+    response = client.get('/orders')
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == data
+
+    response = client.get('/health', headers={'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in response.headers
+
+
+@patch('app.get_db_connection')
+def test_liveness_and_cached_readiness(mock_db, client):
+    """
+    Unit Test 12: /livez ne dodiruje bazu; /readyz koristi konekciju iz pool-a
+    i kešira rezultat, a pun pool ne proglašava pod nespremnim
+    """
+    response = client.get('/livez')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'alive'
+    mock_db.assert_not_called()
+
+    mock_pool = MagicMock()
+    readiness = ReadinessCheck(mock_pool, cache_seconds=60)
+    with patch('app.readiness', readiness):
+        assert client.get('/readyz').status_code == 200
+        assert client.get('/readyz').get_json()['database'] == 'ok'
+        mock_pool.getconn.assert_called_once_with(timeout=1.0)
+        mock_pool.getconn.return_value.close.assert_called_once()
+
+    mock_pool.getconn.side_effect = Exception('connection refused')
+    readiness = ReadinessCheck(mock_pool, cache_seconds=0)
+    with patch('app.readiness', readiness):
+        response = client.get('/readyz')
+        assert response.status_code == 503
+        assert response.get_json()['database'] == 'connection refused'
+
+        mock_pool.getconn.side_effect = PoolTimeout('pool exhausted')
+        response = client.get('/readyz')
+        assert response.status_code == 200
+        assert response.get_json()['database'] == 'busy'
+
+
+def test_metrics_endpoint():
+    """
+    Unit Test 13: /metrics broji zahteve po šablonu rute, meri upite preko
+    kursora iz pool-a i pozive Catalog Service-a
+    """
+    from prometheus_client import REGISTRY
+    from catalog_client import CatalogClient
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    app.config['TESTING'] = True
+    client = app.test_client()
+    before = sample('http_requests_total', method='GET', route='/livez', status='200')
+    client.get('/livez')
+    client.get('/livez')
+    assert sample('http_requests_total', method='GET', route='/livez', status='200') == before + 2
+    assert sample('http_requests_in_flight') == 0
+
+    class FakeCursor:
+        def execute(self, query, vars=None):
+            pass
+
+    before = sample('db_query_duration_seconds_count', operation='UPDATE')
+    timed_cursor_class(FakeCursor)().execute(b"UPDATE orders SET status = 'completed'")
+    assert sample('db_query_duration_seconds_count', operation='UPDATE') == before + 1
+    assert timed_cursor_class(FakeCursor) is timed_cursor_class(FakeCursor)
+
+    catalog = CatalogClient()
+    with patch.object(catalog.session, 'request') as mock_request:
+        mock_request.return_value = MagicMock(status_code=404)
+        assert catalog.get_product(99) is None
+    assert sample('catalog_client_request_duration_seconds_count',
+                  operation='get_product', outcome='404') == 1
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{' in body
+    assert 'route="/livez"' in body
+
+
+@patch('app.get_db_connection')
+def test_create_order_propagates_trace(mock_db, client, tmp_path):
+    """
+    Unit Test 14: Trace iz create_order() se prenosi u Catalog Service
+    (traceparent zaglavlje) i u poruku iz reda; span-ovi se izvoze kao OTLP/JSON
+    """
+    import app as app_module
+
+    trace_id, parent_span_id = 'a' * 32, 'b' * 16
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.fetchone.return_value = {'id': 7}
+    mock_db.return_value = mock_conn
+
+    stock = {'all_available': True, 'items': [{
+        'product_id': 1, 'available': True, 'price': 10.0,
+        'product_code': 'PROD-001', 'product_name': 'Proizvod'
+    }]}
+    catalog_headers = []
+
+    def catalog_request(method, url, headers=None, **kwargs):
+        catalog_headers.append(headers)
+        return MagicMock(status_code=200, json=lambda: stock)
+
+    export_file = tmp_path / 'traces.jsonl'
+    tracing.configure('order-service', file_path=str(export_file))
+    try:
+        with patch('queue_client.QueueServiceClient'), \
+                patch('queue_client.QueueClient') as mock_queue, \
+                patch.object(app_module.catalog_client.session, 'request', side_effect=catalog_request):
+            with patch('app.queue_client', QueueMessageClient()):
+                response = client.post('/orders', json={
+                    'customer_id': 'CUST-001', 'customer_name': 'Kupac',
+                    'items': [{'product_id': 1, 'quantity': 2}]
+                }, headers={'traceparent': f'00-{trace_id}-{parent_span_id}-01'})
+            sent = mock_queue.from_connection_string.return_value.send_message.call_args[0][0]
+        tracing.flush()
+    finally:
+        tracing.configure('order-service')
+
+    assert response.status_code == 201
+    assert response.get_json()['trace_id'] == trace_id
+    assert response.headers['traceparent'].startswith(f'00-{trace_id}-')
+
+    assert len(catalog_headers) == 2
+    assert all(tracing.parse_traceparent(h['traceparent']).trace_id == trace_id
+               for h in catalog_headers)
+    assert tracing.parse_traceparent(decode_message(sent)['traceparent']).trace_id == trace_id
+
+    spans = [span for line in export_file.read_text().splitlines()
+             for span in json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans']]
+    by_name = {span['name']: span for span in spans}
+    assert set(by_name) == {'POST /orders', 'catalog.check_stock', 'catalog.reserve_stock',
+                            'invoice.enqueue'}
+    assert all(span['traceId'] == trace_id for span in spans)
+    server = by_name['POST /orders']
+    assert server['parentSpanId'] == parent_span_id
+    assert by_name['catalog.check_stock']['parentSpanId'] == server['spanId']
+    assert {'key': 'order.number', 'value': {'stringValue': decode_message(sent)['order_number']}} \
+        in server['attributes']
+
+
+def test_server_timing_and_slow_query_log(caplog):
+    """
+    Unit Test 15: Upiti jednog zahteva se sabiraju u Server-Timing zaglavlju,
+    a spori upiti se loguju bez vrednosti parametara
+    """
+    from flask import Flask
+    from metrics import init_metrics
+
+    class FakeCursor:
+        def execute(self, query, vars=None):
+            pass
+
+    timing_app = Flask('timing')
+    init_metrics(timing_app)
+
+    @timing_app.route('/two-queries')
+    def two_queries():
+        cursor = timed_cursor_class(FakeCursor)()
+        cursor.execute("SELECT * FROM orders WHERE id = %s", (1,))
+        cursor.execute("UPDATE orders SET customer_name = 'Marko' WHERE id = 42")
+        return 'ok'
+
+    with patch('db._SLOW_QUERY_SECONDS', 0.0), caplog.at_level('WARNING', logger='db'):
+        response = timing_app.test_client().get('/two-queries')
+
+    server_timing = response.headers['Server-Timing']
+    assert server_timing.startswith('db;dur=')
+    assert 'desc="2 queries"' in server_timing
+    assert ', app;dur=' in server_timing
+
+    slow = [record.getMessage() for record in caplog.records if 'Slow query' in record.getMessage()]
+    assert len(slow) == 2
+    assert '1 params redacted' in slow[0]
+    assert slow[1].endswith("UPDATE orders SET customer_name = ? WHERE id = ?")
+    assert 'Marko' not in ' '.join(slow)
+
+    # Upit van zahteva (npr. listener thread) se ne pripisuje nijednom zahtevu
+    timed_cursor_class(FakeCursor)().execute("SELECT 1")
+
+
+def test_admin_profile_endpoint():
+    """
+    Unit Test 16: /admin/profile postoji samo uz ADMIN_TOKEN, traži ga u
+    Authorization zaglavlju i vraća collapsed stekove
+    """
+    from flask import Flask
+    import profiler
+
+    disabled_app = Flask('no-token')
+    assert profiler.init_flask(disabled_app, '', max_seconds=5) is None
+    assert disabled_app.test_client().get('/admin/profile').status_code == 404
+
+    profile_app = Flask('profile')
+    profiler.init_flask(profile_app, 's3cret', max_seconds=5)
+    client = profile_app.test_client()
+
+    assert client.get('/admin/profile').status_code == 401
+    assert client.get('/admin/profile', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    auth = {'Authorization': 'Bearer s3cret'}
+    assert client.get('/admin/profile?seconds=60', headers=auth).status_code == 400
+    assert client.get('/admin/profile?mode=heap', headers=auth).status_code == 400
+
+    response = client.get('/admin/profile?seconds=0.2&interval_ms=5&mode=wall', headers=auth)
+    assert response.status_code == 200
+    assert response.headers['X-Profile-Pid'] == str(os.getpid())
+    # U wall modu se vidi i thread koji čeka na kraj profilisanja
+    lines = response.get_data(as_text=True).splitlines()
+    assert any('profile (profiler.py:' in line for line in lines)
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines)
+
+
+class FakeListenConnection:
+    """psycopg2 konekcija za listener: LISTEN traje listen_delay sekundi, select čeka na socket."""
+
+    def __init__(self, listen_delay=0.0, on_listen=None):
+        import socket
+        self._reader, self._writer = socket.socketpair()
+        self.listen_delay = listen_delay
+        self.on_listen = on_listen
+        self.notifies = []
+        self.closed = False
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def set_isolation_level(self, level):
+        pass
+
+    def cursor(self):
+        cursor = MagicMock()
+        cursor.__enter__.return_value = cursor
+
+        def execute(query):
+            time.sleep(self.listen_delay)
+            if self.on_listen:
+                self.on_listen()
+        cursor.execute.side_effect = execute
+        return cursor
+
+    def poll(self):
+        pass
+
+    def close(self):
+        self.closed = True
+        self._reader.close()
+        self._writer.close()
+
+
+def test_order_events_listener_lifecycle():
+    """
+    Unit Test 17: subscribe(wait) se vraća tek kad je LISTEN aktivan, 'resync'
+    stiže i posle prvog LISTEN-a, a listener se gasi kad nema pretplatnika
+    """
+    connections = []
+
+    def connect(**params):
+        connections.append(FakeListenConnection(listen_delay=0.2))
+        return connections[-1]
+
+    broadcaster = OrderEventBroadcaster({}, max_pending=10, poll_timeout=0.05, idle_timeout=0.1)
+    with patch('order_events.psycopg2.connect', side_effect=connect):
+        early = broadcaster.subscribe()
+        assert not broadcaster.listening
+        waiting = broadcaster.subscribe(wait=5)
+        assert broadcaster.listening
+
+        # Pretplata pre prvog LISTEN-a je mogla da propusti NOTIFY
+        assert early.get(timeout=1) == ('resync', '{}')
+        assert waiting.get(timeout=1) == ('resync', '{}')
+
+        broadcaster.unsubscribe(early)
+        broadcaster.unsubscribe(waiting)
+        deadline = time.monotonic() + 5
+        while not connections[0].closed and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert connections[0].closed
+        assert not broadcaster.listening
+
+        # Nova pretplata pokreće novi listener
+        broadcaster.subscribe(wait=5)
+        assert len(connections) == 2 and broadcaster.listening
+        broadcaster.stop()
+
+
+@patch('app.fetch_order')
+def test_long_poll_does_not_miss_changes_without_events(mock_fetch, client):
+    """
+    Unit Test 18: long-poll vidi promenu i kad njen NOTIFY ne stigne: commit
+    pre prvog LISTEN-a, događaj odbačen zbog prepunjene pretplate, promena
+    pred sam istek timeout-a
+    """
+    processing = {'id': 1, 'status': 'processing', 'pdf_url': None}
+    completed = {'id': 1, 'status': 'completed', 'pdf_url': 'http://blob/1.pdf'}
+    database = {'order': processing}
+    read_while_listening = []
+
+    def fetch(order_id):
+        read_while_listening.append(broadcaster.listening)
+        return database['order']
+
+    mock_fetch.side_effect = fetch
+    broadcaster = OrderEventBroadcaster({}, max_pending=2, poll_timeout=0.05)
+    # Worker commit-uje 'completed' dok LISTEN još nije aktivan; NOTIFY se gubi
+    listen_connection = FakeListenConnection(
+        listen_delay=0.2, on_listen=lambda: database.update(order=completed)
+    )
+
+    with patch('order_events.psycopg2.connect', return_value=listen_connection), \
+            patch('app.order_events', broadcaster):
+        data = client.get('/orders/1?wait_for=completed&timeout=5').get_json()
+        assert data['timed_out'] is False
+        assert data['order']['status'] == 'completed'
+        assert all(read_while_listening)
+
+        # Bulk ažuriranje drugih narudžbina prepuni pretplatu pre događaja za ovu
+        database['order'] = processing
+
+        def bulk_update():
+            database['order'] = completed
+            for other_id in range(2, 6):
+                broadcaster.publish('order', json.dumps({'id': other_id, 'status': 'completed'}))
+            broadcaster.publish('order', '{"id": 1, "status": "completed"}')
+
+        threading.Timer(0.1, bulk_update).start()
+        started = time.monotonic()
+        data = client.get('/orders/1?wait_for=completed&timeout=5').get_json()
+        assert data['timed_out'] is False
+        assert time.monotonic() - started < 2
+
+        # Promena bez događaja pred istek: odgovor ipak nosi sveže stanje
+        database['order'] = processing
+        threading.Timer(0.1, lambda: database.update(order=completed)).start()
+        data = client.get('/orders/1?wait_for=completed&timeout=0.3').get_json()
+        assert data['timed_out'] is False
+        assert data['order']['status'] == 'completed'
+        broadcaster.stop()
@@ -0,0 +1,341 @@
+"""
+Tracing
+Jedan trace prati narudžbinu kroz order-service, pozive Catalog Service-a,
+red faktura i invoice worker. Kontekst se prenosi W3C traceparent
+zaglavljem (HTTP) odnosno poljem 'traceparent' u poruci iz reda.
+
+Završeni span-ovi se u pozadinskom thread-u, u grupama, izvoze u OTLP/JSON
+formatu (OpenTelemetry): kao linije u fajlu (TRACE_EXPORT_FILE) i/ili POST
+na collector (OTEL_EXPORTER_OTLP_ENDPOINT + /v1/traces). Bez izvoza se ID-jevi
+i dalje prenose, pa logovi i odgovori ostaju povezani.
+
+Isti modul postoji u order-service, catalog-service i invoice-worker.
+"""
+import os
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import threading
+import urllib.request
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# OTLP SpanKind
+INTERNAL, SERVER, CLIENT, PRODUCER, CONSUMER = 1, 2, 3, 4, 5
+
+STATUS_ERROR = 2
+
+SpanContext = namedtuple('SpanContext', ['trace_id', 'span_id', 'sampled'])
+
+
+def parse_traceparent(value):
+    """'00-<trace_id>-<span_id>-<flags>' -> SpanContext, ili None ako nije ispravan."""
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[0] == 'ff':
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    if parts[1] == '0' * 32 or parts[2] == '0' * 16:
+        return None
+    return SpanContext(parts[1], parts[2], bool(flags & 1))
+
+
+def format_traceparent(context):
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+def _attribute_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+
+    def __init__(self, name, context, parent_span_id, kind, attributes, exporter):
+        self.name = name
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._exporter = exporter
+
+    @property
+    def traceparent(self):
+        return format_traceparent(self.context)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, error):
+        self.status = {'code': STATUS_ERROR, 'message': str(error)}
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.context.sampled and self._exporter is not None:
+            self._exporter.export(self)
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.context.trace_id,
+            'spanId': self.context.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [
+                {'key': key, 'value': _attribute_value(value)}
+                for key, value in self.attributes.items() if value is not None
+            ],
+        }
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        if self.status:
+            span['status'] = self.status
+        return span
+
+
+class SpanExporter:
+    """
+    Span-ovi se skupljaju u ograničen red i izvoze u grupama iz pozadinskog
+    thread-a, pa zahtev ne čeka na disk ni mrežu. Kad je red pun, novi
+    span-ovi se odbacuju. Thread se pokreće tek sa prvim span-om (posle
+    fork-a gunicorn worker-a).
+    """
+
+    def __init__(self, service_name, file_path=None, collector_url=None,
+                 flush_interval=2.0, max_queue=4096, max_batch=512):
+        self.service_name = service_name
+        self.file_path = file_path
+        self.collector_url = collector_url.rstrip('/') + '/v1/traces' if collector_url else None
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pid = None
+        self._spans = None
+        self._thread = None
+
+    def export(self, span):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._spans.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._spans = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            batch = [self._spans.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._spans.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        """
+        Izvozi span-ove koji čekaju u redu i čeka grupu koju thread upravo
+        izvozi (pri gašenju procesa).
+        """
+        if self._pid != os.getpid():
+            return
+        batch = []
+        while True:
+            try:
+                batch.append(self._spans.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+        self._spans.join()
+
+    def to_otlp(self, spans):
+        return {'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': self.service_name}}
+            ]},
+            'scopeSpans': [{
+                'scope': {'name': 'cloud-order-system'},
+                'spans': [span.to_otlp() for span in spans]
+            }]
+        }]}
+
+    def _write(self, spans):
+        try:
+            body = json.dumps(self.to_otlp(spans), separators=(',', ':'))
+            if self.file_path:
+                with self._write_lock, open(self.file_path, 'a') as f:
+                    f.write(body + '\n')
+            if self.collector_url:
+                request = urllib.request.Request(
+                    self.collector_url, data=body.encode('utf-8'),
+                    headers={'Content-Type': 'application/json'}, method='POST'
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            logger.warning(f"Could not export {len(spans)} spans: {e}")
+        finally:
+            for _ in spans:
+                self._spans.task_done()
+
+
+_current_span = ContextVar('current_span', default=None)
+_exporter = None
+_sample_ratio = 1.0
+
+
+def configure(service_name, file_path=None, collector_url=None, sample_ratio=1.0):
+    """Podešava izvoz span-ova za ovaj proces; bez fajla i collector-a nema izvoza."""
+    global _exporter, _sample_ratio
+    _sample_ratio = sample_ratio
+    _exporter = None
+    if file_path or collector_url:
+        _exporter = SpanExporter(service_name, file_path=file_path, collector_url=collector_url)
+    return _exporter
+
+
+def start_span(name, parent=None, kind=INTERNAL, attributes=None):
+    """
+    parent je SpanContext iz traceparent-a; bez njega se nastavlja tekući
+    span, a ako ni njega nema, počinje novi trace.
+    """
+    if parent is None:
+        current = _current_span.get()
+        parent = current.context if current is not None else None
+
+    span_id = f'{random.getrandbits(64):016x}'
+    if parent is None:
+        context = SpanContext(f'{random.getrandbits(128):032x}', span_id,
+                              random.random() < _sample_ratio)
+        parent_span_id = None
+    else:
+        context = SpanContext(parent.trace_id, span_id, parent.sampled)
+        parent_span_id = parent.span_id
+    return Span(name, context, parent_span_id, kind, attributes, _exporter)
+
+
+@contextmanager
+def span(name, parent=None, kind=INTERNAL, attributes=None):
+    new_span = start_span(name, parent=parent, kind=kind, attributes=attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except Exception as e:
+        new_span.set_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.end()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id():
+    current = _current_span.get()
+    return current.context.trace_id if current is not None else None
+
+
+def set_attribute(key, value):
+    current = _current_span.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+def trace_headers():
+    """Zaglavlja za odlazni HTTP poziv u okviru tekućeg span-a."""
+    current = _current_span.get()
+    return {'traceparent': current.traceparent} if current is not None else {}
+
+
+def flush():
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def init_flask(app, excluded_paths=('/livez', '/readyz', '/health', '/metrics')):
+    """Server span po zahtevu, nastavlja traceparent iz zaglavlja ako postoji."""
+    from flask import g, request
+
+    excluded = set(excluded_paths)
+
+    def before_request():
+        if request.path in excluded:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        server_span = start_span(
+            f"{request.method} {route}",
+            parent=parse_traceparent(request.headers.get('traceparent')),
+            kind=SERVER,
+            attributes={'http.method': request.method, 'http.route': route,
+                        'http.target': request.full_path.rstrip('?')}
+        )
+        g.trace_span = server_span
+        g.trace_previous = _current_span.set(server_span)
+
+    def after_request(response):
+        server_span = g.get('trace_span')
+        if server_span is not None:
+            server_span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                server_span.set_error(f"HTTP {response.status_code}")
+            response.headers['traceparent'] = server_span.traceparent
+        return response
+
+    def teardown_request(exc):
+        server_span = g.pop('trace_span', None)
+        if server_span is None:
+            return
+        if exc is not None:
+            server_span.set_error(exc)
+        try:
+            _current_span.reset(g.pop('trace_previous'))
+        except ValueError:
+            # Teardown u drugom kontekstu (npr. drugi thread); span se ipak završava
+            _current_span.set(None)
+        server_span.end()
+
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)